@@ -1,54 +1,171 @@
 import asyncio
 import aiohttp
+import orjson
 import time
-import json
-from typing import Dict, Optional, Tuple, List
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from typing import AsyncIterator, Dict, Iterator, Optional, Set, Tuple, List
 from datetime import datetime, timezone
-import random
 
 from . import utils
 from .config import (
     DATA_API_BASE,
     LEADERBOARD_URL,
     GRAPHQL_URL,
-    DELAY_BETWEEN_REQUESTS,
     DELAY_AFTER_429,
+    PROXY_429_COOLDOWN,
     MIN_HOLDER_BALANCE,
     DELAY_BETWEEN_BATCHES,
-    ADAPTIVE_BACKOFF_MULTIPLIER
+    ADAPTIVE_BACKOFF_MULTIPLIER,
+    MAX_CONCURRENT_INITIAL,
+    GRAPHQL_RATE_LIMIT,
+    DATA_API_RATE_LIMIT,
+    RATE_LIMIT_LOW_REMAINING
 )
 
 
-@utils.retry_async(retries=5, delay=1.0, backoff=1.5, exceptions=(aiohttp.ClientError, asyncio.TimeoutError))
-async def fetch_traded_count(sessions: List[aiohttp.ClientSession], wallet_address: str) -> Optional[int]:
-    """Fetches traded count for wallet."""
-    session_idx = random.randint(0, len(sessions) - 1)
-    session = sessions[session_idx]
-    # Proxy is already bound to session
+# Token bucket на endpoint: допускает всплески до rate и ровно ограничивает поток
+GRAPHQL_LIMITER = utils.RateLimiter(GRAPHQL_RATE_LIMIT, 1.0)
+DATA_API_LIMITER = utils.RateLimiter(DATA_API_RATE_LIMIT, 1.0)
+
+# Текст запроса постоянный, меняются только variables
+HOLDERS_QUERY = """
+query GetHolders($limit: Int!, $minBalance: BigInt!, $assets: [String!]!) {
+  userBalances(
+    first: $limit
+    skip: 0
+    where: {
+      balance_gt: $minBalance
+      asset_in: $assets
+    }
+    orderBy: balance
+    orderDirection: desc
+  ) {
+    user
+    balance
+    asset {
+      id
+    }
+  }
+}
+"""
+
+# Тело запроса = готовый префикс + orjson.dumps(variables) + b'}', без json.dumps на каждый POST
+HOLDERS_BODY_PREFIX = b'{"query":' + orjson.dumps(HOLDERS_QUERY) + b',"variables":'
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+def holders_body(variables: dict) -> bytes:
+    return HOLDERS_BODY_PREFIX + orjson.dumps(variables) + b'}'
+
+
+class SessionPool:
+    """Spreads requests over proxy-bound sessions.
+
+    Picks the session with the fewest requests in flight, breaking ties in
+    round-robin order so every proxy gets an even share of the load.
+    A session that got a 429 is skipped until its cool-down (Retry-After,
+    or PROXY_429_COOLDOWN) expires. Attached AdmissionControllers are told
+    about every 429 and success so they can adapt their limits.
+    """
+
+    def __init__(self, sessions: List[aiohttp.ClientSession]):
+        self.sessions = sessions
+        self.inflight = [0] * len(sessions)
+        self.cooldown = [0.0] * len(sessions)  # time.monotonic() until which the session is skipped
+        self.rr_idx = 0
+        self.controllers: List[utils.AdmissionController] = []
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def mark_429(self, idx: int, retry_after: Optional[float] = None) -> None:
+        until = time.monotonic() + (retry_after if retry_after is not None else PROXY_429_COOLDOWN)
+        self.cooldown[idx] = max(self.cooldown[idx], until)
+
+    @contextmanager
+    def attach(self, controller: utils.AdmissionController) -> Iterator[utils.AdmissionController]:
+        """Feeds this pool's 429/success signals to `controller` for the duration of the block."""
+        self.controllers.append(controller)
+        try:
+            yield controller
+        finally:
+            self.controllers.remove(controller)
+
+    async def observe(self, headers) -> None:
+        """Shrinks attached controllers by one when X-RateLimit-Remaining runs low.
+
+        Called by the Data API fetchers on every successful response; a no-op
+        when no controller is attached.
+        """
+        if not self.controllers:
+            return
+        remaining = utils.rate_limit_remaining(headers)
+        if remaining is not None and remaining <= RATE_LIMIT_LOW_REMAINING:
+            for controller in self.controllers:
+                await controller.on_quota_low()
+
+    async def _select(self) -> int:
+        n = len(self.sessions)
+        while True:
+            now = time.monotonic()
+            start = self.rr_idx
+            ready = [(start + k) % n for k in range(n) if self.cooldown[(start + k) % n] <= now]
+            if ready:
+                self.rr_idx = (start + 1) % n
+                # min() keeps the first minimum, so scanning from the cursor is the tiebreak
+                return min(ready, key=self.inflight.__getitem__)
+            # Все прокси на cool-down: ждём ближайший
+            await asyncio.sleep(min(self.cooldown) - now)
+
+    @asynccontextmanager
+    async def pick(self) -> AsyncIterator[aiohttp.ClientSession]:
+        idx = await self._select()
+        self.inflight[idx] += 1
+        try:
+            yield self.sessions[idx]
+        except aiohttp.ClientResponseError as e:
+            if e.status == 429:
+                self.mark_429(idx, utils.parse_retry_after(e.headers))
+                for controller in self.controllers:
+                    await controller.on_rate_limited()
+            raise
+        else:
+            for controller in self.controllers:
+                await controller.on_success()
+        finally:
+            self.inflight[idx] -= 1
+
+
+@utils.singleflight(ttl=60, ignore=('sem',))
+@utils.RETRY_DATA
+async def fetch_traded_count(
+    pool: SessionPool,
+    wallet_address: str,
+    sem: Optional[utils.AdmissionController] = None
+) -> Optional[int]:
+    """Fetches traded count for wallet. `sem` is held per attempt, not across retry sleeps."""
     traded_url = f"{DATA_API_BASE}/traded"
     params = {'user': wallet_address}
 
-    async with session.get(traded_url, params=params, ssl=False) as response:
-        if response.status == 429:
-            raise aiohttp.ClientResponseError(
-                response.request_info,
-                response.history,
-                status=response.status,
-                message="Rate limit exceeded",
-                headers=response.headers,
-            )
-        response.raise_for_status()
-        data = await response.json()
+    async with sem or nullcontext():
+        # Proxy is already bound to session
+        async with DATA_API_LIMITER, pool.pick() as session, session.get(traded_url, params=params) as response:
+            utils.raise_if_rate_limited(response)
+            response.raise_for_status()
+            await pool.observe(response.headers)
+            data = await utils.read_json(response)
     
     return data.get('traded', 0)
 
 
-@utils.retry_async(retries=5, delay=1.0, backoff=1.5, exceptions=(aiohttp.ClientError, asyncio.TimeoutError))
-async def fetch_volume(sessions: List[aiohttp.ClientSession], wallet_address: str) -> Optional[float]:
-    """Fetches trading volume for wallet."""
-    session_idx = random.randint(0, len(sessions) - 1)
-    session = sessions[session_idx]
-    # Proxy is already bound to session
+@utils.singleflight(ttl=60, ignore=('sem',))
+@utils.RETRY_DATA
+async def fetch_volume(
+    pool: SessionPool,
+    wallet_address: str,
+    sem: Optional[utils.AdmissionController] = None
+) -> Optional[float]:
+    """Fetches trading volume for wallet. `sem` is held per attempt, not across retry sleeps."""
     leaderboard_params = {
         'timePeriod': 'all',
         'orderBy': 'VOL',
@@ -58,29 +175,29 @@ async def fetch_volume(sessions: List[aiohttp.ClientSession], wallet_address: st
         'user': wallet_address
     }
 
-    async with session.get(LEADERBOARD_URL, params=leaderboard_params, ssl=False) as response:
-        if response.status == 429:
-            raise aiohttp.ClientResponseError(
-                response.request_info,
-                response.history,
-                status=response.status,
-                message="Rate limit exceeded",
-                headers=response.headers,
-            )
-        response.raise_for_status()
-        leaderboard_data = await response.json()
+    async with sem or nullcontext():
+        # Proxy is already bound to session
+        async with DATA_API_LIMITER, pool.pick() as session, session.get(LEADERBOARD_URL, params=leaderboard_params) as response:
+            utils.raise_if_rate_limited(response)
+            response.raise_for_status()
+            await pool.observe(response.headers)
+            leaderboard_data = await utils.read_json(response)
     
     if leaderboard_data and len(leaderboard_data) > 0:
         return float(leaderboard_data[0].get('vol', 0))
     return 0.0
 
 
-@utils.retry_async(retries=5, delay=1.0, backoff=1.5, exceptions=(aiohttp.ClientError, asyncio.TimeoutError))
-async def fetch_wallet_age(sessions: List[aiohttp.ClientSession], wallet_address: str) -> Optional[int]:
-    """Fetches wallet age in days."""
-    session_idx = random.randint(0, len(sessions) - 1)
-    session = sessions[session_idx]
-    # Proxy is already bound to session
+@utils.singleflight(ttl=60, ignore=('now_ts', 'sem'))
+@utils.RETRY_DATA
+async def fetch_wallet_age(
+    pool: SessionPool,
+    wallet_address: str,
+    now_ts: Optional[int] = None,
+    sem: Optional[utils.AdmissionController] = None
+) -> Optional[int]:
+    """Fetches wallet age in days. `now_ts` lets a batch share one timestamp;
+    `sem` is held per attempt, not across retry sleeps."""
     activity_url = f"{DATA_API_BASE}/activity"
     params = {
         'user': wallet_address,
@@ -89,57 +206,63 @@ async def fetch_wallet_age(sessions: List[aiohttp.ClientSession], wallet_address
         'limit': 1
     }
 
-    async with session.get(activity_url, params=params, ssl=False) as response:
-        if response.status == 429:
-            raise aiohttp.ClientResponseError(
-                response.request_info,
-                response.history,
-                status=response.status,
-                message="Rate limit exceeded",
-                headers=response.headers,
-            )
-        response.raise_for_status()
-        trades = await response.json()
+    async with sem or nullcontext():
+        # Proxy is already bound to session
+        async with DATA_API_LIMITER, pool.pick() as session, session.get(activity_url, params=params) as response:
+            utils.raise_if_rate_limited(response)
+            response.raise_for_status()
+            await pool.observe(response.headers)
+            trades = await utils.read_json(response)
     
     if trades and len(trades) > 0:
         first_trade_timestamp = trades[0].get('timestamp')
         if first_trade_timestamp:
-            current_timestamp = int(time.time())
-            age_seconds = current_timestamp - first_trade_timestamp
-            return int(age_seconds / (60 * 60 * 24))
+            if now_ts is None:
+                now_ts = int(time.time())
+            return (now_ts - first_trade_timestamp) // 86400
     return None
 
 
-@utils.retry_async(retries=5, delay=1.0, backoff=1.5, exceptions=(aiohttp.ClientError, asyncio.TimeoutError))
-async def get_wallet_stats(sessions: List[aiohttp.ClientSession], wallet_address: str) -> Tuple[Optional[int], Optional[float], Optional[int]]:
-    """Асинхронно получает статистику кошелька параллельно."""
-    tasks = [
-        fetch_traded_count(sessions, wallet_address),
-        fetch_volume(sessions, wallet_address),
-        fetch_wallet_age(sessions, wallet_address)
-    ]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    
-    traded_count = 0
-    if not isinstance(results[0], Exception):
-        traded_count = results[0] or 0
-    
-    vol = 0.0
-    if not isinstance(results[1], Exception):
-        vol = results[1] or 0.0
-    
-    wallet_age_days = None
-    if not isinstance(results[2], Exception):
-        wallet_age_days = results[2]
-    
-    await asyncio.sleep(0.3)  # Increased delay to mitigate rate limits
-    
-    return traded_count, vol, wallet_age_days
+async def batch_wallet_stats(
+    pool: SessionPool,
+    wallets: List[str],
+    out: Dict[str, tuple],
+    sem: Optional[utils.AdmissionController] = None
+) -> Set[str]:
+    """Fetches stats for a chunk of wallets into out[wallet] = (traded, vol, age).
+
+    The Data API has no multi-user variant of /traded, /leaderboard or /activity
+    (and the positions subgraph only exposes balances), so all 3*N requests go
+    into one gather. Failed lookups fall back to 0 / 0.0 / None;
+    returns the wallets with any failed lookup (don't cache them).
+    """
+    n = len(wallets)
+    now_ts = int(time.time())
 
+    # sem bounds each HTTP attempt inside the fetchers, so retry backoff never holds a slot
+    results = await asyncio.gather(
+        *[fetch_traded_count(pool, w, sem=sem) for w in wallets],
+        *[fetch_volume(pool, w, sem=sem) for w in wallets],
+        *[fetch_wallet_age(pool, w, now_ts=now_ts, sem=sem) for w in wallets],
+        return_exceptions=True,
+    )
+    failed = set()
+    for i, wallet in enumerate(wallets):
+        traded, vol, age = results[i], results[n + i], results[2 * n + i]
+        if isinstance(traded, BaseException) or isinstance(vol, BaseException) or isinstance(age, BaseException):
+            failed.add(wallet)
+        out[wallet] = (
+            0 if isinstance(traded, BaseException) else (traded or 0),
+            0.0 if isinstance(vol, BaseException) else (vol or 0.0),
+            None if isinstance(age, BaseException) else age,
+        )
+    return failed
 
-@utils.retry_async(retries=3, delay=2, backoff=2, exceptions=(aiohttp.ClientError, asyncio.TimeoutError))
+
+@utils.singleflight(ttl=60)
+@utils.RETRY_GQL
 async def fetch_holders_for_asset(
-    session: aiohttp.ClientSession,
+    pool: SessionPool,
     asset_id: str,
     min_balance: float = MIN_HOLDER_BALANCE,
     limit: int = 300
@@ -150,45 +273,13 @@ async def fetch_holders_for_asset(
 
     min_balance_raw = str(int(min_balance * 1000000))
     
-    query = """
-    query GetHolders {
-      userBalances(
-        first: %d
-        skip: 0
-        where: {
-          balance_gt: "%s"
-          asset_in: ["%s"]
-        }
-        orderBy: balance
-        orderDirection: desc
-      ) {
-        user
-        balance
-        asset {
-          id
-        }
-      }
-    }
-    """ % (limit, min_balance_raw, asset_id)
-    
-    payload = {"query": query}
+    body = holders_body({"limit": limit, "minBalance": min_balance_raw, "assets": [asset_id]})
     
     # Proxy is already bound to session
-    async with session.post(GRAPHQL_URL, json=payload, ssl=False) as response:
-        if response.status == 429:
-            # Для ошибки 429 (Too Many Requests) вызываем исключение, чтобы retry-декоратор сработал
-            raise aiohttp.ClientResponseError(
-                response.request_info,
-                response.history,
-                status=response.status,
-                message="Rate limit exceeded",
-                headers=response.headers,
-            )
-        
+    async with GRAPHQL_LIMITER, pool.pick() as session, session.post(GRAPHQL_URL, data=body, headers=JSON_HEADERS) as response:
+        utils.raise_if_rate_limited(response)
         response.raise_for_status()
-        data = await response.json()
-    
-    await asyncio.sleep(DELAY_BETWEEN_REQUESTS)
+        data = await utils.read_json(response)
     
     if "data" in data and "userBalances" in data["data"]:
         holders = {}
@@ -212,152 +303,143 @@ async def fetch_holders_for_asset(
     return {}
 
 
-@utils.retry_async(retries=3, delay=0.5, backoff=1.5, exceptions=(aiohttp.ClientError, asyncio.TimeoutError))
+@utils.RETRY_GQL
+async def _fetch_holders_batch(
+    pool: SessionPool,
+    batch: List[str],
+    min_balance_raw: str,
+    limit: int
+) -> dict:
+    """Один GraphQL-запрос холдеров для пачки ассетов; ретраится сам по себе."""
+    body = holders_body({"limit": limit, "minBalance": min_balance_raw, "assets": batch})
+    
+    # Proxy is already bound to session
+    async with GRAPHQL_LIMITER, pool.pick() as session, session.post(GRAPHQL_URL, data=body, headers=JSON_HEADERS) as response:
+        utils.raise_if_rate_limited(response)
+        response.raise_for_status()
+        return await utils.read_json(response)
+
+
 async def fetch_holders_for_assets(
-    sessions: List[aiohttp.ClientSession],
+    pool: SessionPool,
     asset_ids: List[str],
     min_balance: float = MIN_HOLDER_BALANCE,
     batch_size: int = 30,  # Increased for efficiency
-    limit: int = 300
+    limit: int = 300,
+    max_concurrent: int = MAX_CONCURRENT_INITIAL
 ) -> Dict[str, Dict[str, float]]:
-    """Batches GraphQL queries for multiple assets to fetch holders efficiently."""
+    """Batches GraphQL queries for multiple assets to fetch holders efficiently.
+
+    Batches are requested concurrently and merged as they complete, so decoding
+    one response overlaps with receiving the next.
+    """
     if not asset_ids:
         return {}
     
     results = {}
-    for i in range(0, len(asset_ids), batch_size):
-        batch = asset_ids[i:i + batch_size]
-        min_balance_raw = str(int(min_balance * 1000000))
-        
-        assets_str = '", "'.join(batch)
-        query = """
-        query GetHoldersBatch {
-          userBalances(
-            first: %d
-            skip: 0
-            where: {
-              balance_gt: "%s"
-              asset_in: ["%s"]
-            }
-            orderBy: balance
-            orderDirection: desc
-          ) {
-            user
-            balance
-            asset {
-              id
-            }
-          }
-        }
-        """ % (limit, min_balance_raw, assets_str)
-        
-        payload = {"query": query}
-        
-        session_idx = random.randint(0, len(sessions) - 1)
-        session = sessions[session_idx]
-        # Proxy is already bound to session
-        async with session.post(GRAPHQL_URL, json=payload, ssl=False) as response:
-            if response.status == 429:
-                raise aiohttp.ClientResponseError(
-                    response.request_info,
-                    response.history,
-                    status=response.status,
-                    message="Rate limit exceeded",
-                    headers=response.headers,
-                )
+    min_balance_raw = str(int(min_balance * 1000000))
+    semaphore = asyncio.Semaphore(max_concurrent)
+    
+    async def fetch_batch(batch_no: int, batch: List[str]):
+        async with semaphore:
+            return batch_no, batch, await _fetch_holders_batch(pool, batch, min_balance_raw, limit)
+    
+    tasks = [
+        asyncio.create_task(fetch_batch(i // batch_size + 1, asset_ids[i:i + batch_size]))
+        for i in range(0, len(asset_ids), batch_size)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            batch_no, batch, data = await next_done
+            data = data or {}
             
-            response.raise_for_status()
-            data = await response.json()
-        
-        await asyncio.sleep(DELAY_BETWEEN_REQUESTS)
-        
-        if "data" in data and "userBalances" in data["data"]:
-            for balance_data in data["data"]["userBalances"]:
-                user_address = balance_data["user"]
-                asset_obj = balance_data.get("asset")
-                if not asset_obj or "id" not in asset_obj:
-                    print(f"Warning: Invalid asset for user {user_address[:10]}...")
-                    continue
-                asset_id = asset_obj["id"]
-                balance_raw = float(balance_data["balance"])
-                balance_shares = round(balance_raw / 1000000, 2)
-                
-                if asset_id not in results:
-                    results[asset_id] = {}
-                if user_address not in results[asset_id]:  # Avoid duplicates
-                    results[asset_id][user_address] = balance_shares
-        
-        if "errors" in data:
-            print(f"GraphQL error for batch {i//batch_size + 1}: {data['errors']}")
-        else:
-            print(f"Batch {i//batch_size + 1}: {len(batch)} assets, processed {len(data['data']['userBalances'])} balances")
+            balances = (data.get("data") or {}).get("userBalances")
+            if balances:
+                # Hot loop: локальные ссылки вместо повторных поисков атрибутов/ключей
+                results_get = results.get
+                for balance_data in balances:
+                    asset_obj = balance_data.get("asset")
+                    if not asset_obj or "id" not in asset_obj:
+                        print(f"Warning: Invalid asset for user {balance_data['user'][:10]}...")
+                        continue
+                    asset_id = asset_obj["id"]
+                    holders = results_get(asset_id)
+                    if holders is None:
+                        holders = results[asset_id] = {}
+                    user_address = balance_data["user"]
+                    if user_address not in holders:  # Avoid duplicates
+                        holders[user_address] = round(float(balance_data["balance"]) / 1000000, 2)
+            
+            if "errors" in data:
+                print(f"GraphQL error for batch {batch_no}: {data['errors']}")
+            else:
+                print(f"Batch {batch_no}: {len(batch)} assets, processed {len(balances or ())} balances")
+    finally:
+        # Если одна пачка упала после всех ретраев — остальные не нужны;
+        # дожидаемся отмены, чтобы исключения не остались неполученными
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
     
     return results
 
 
-@utils.retry_async(retries=3, delay=1.0, backoff=2.0, exceptions=(aiohttp.ClientError, asyncio.TimeoutError))
-async def fetch_closed_positions(wallet: str, sessions: List[aiohttp.ClientSession], semaphore: asyncio.Semaphore) -> List[float]:
-    """Fetch closed positions with sequential offset calls to avoid rate limits."""
+@utils.RETRY_DATA
+async def fetch_closed_positions(wallet: str, pool: SessionPool, semaphore: utils.AdmissionController) -> List[float]:
+    """Fetch closed positions, requesting all offset pages concurrently.
+
+    `semaphore` bounds in-flight page requests across wallets; it must not be
+    the same limiter the caller holds while awaiting this function.
+    """
     offsets = [0, 25, 50]
-    all_positions = []
 
-    for offset in offsets:
-        # Don't use semaphore here - it's controlled at higher level
+    async def fetch_page(offset: int) -> List[float]:
         url = f"https://data-api.polymarket.com/closed-positions?user={wallet}&sortBy=realizedpnl&sortDirection=DESC&limit=25&offset={offset}"
-        session_idx = random.randint(0, len(sessions) - 1)
-        session = sessions[session_idx]
-        # Proxy is already bound to session
-        async with session.get(url, ssl=False) as response:
-            if response.status == 429:
-                raise aiohttp.ClientResponseError(
-                    response.request_info,
-                    response.history,
-                    status=response.status,
-                    message="Rate limit exceeded",
-                    headers=response.headers,
-                )
-            response.raise_for_status()
-            data = await response.json()
-
-            # Handle response - it should be a list directly
-            if isinstance(data, list):
-                positions = [float(pos.get('totalBought', 0)) for pos in data if isinstance(pos, dict)]
-            else:
-                # Some APIs return {data: [...]}
-                positions = data.get('data', []) if isinstance(data, dict) else []
-                positions = [float(pos.get('totalBought', 0)) for pos in positions if isinstance(pos, dict)]
+        async with semaphore:
+            # Proxy is already bound to session
+            async with DATA_API_LIMITER, pool.pick() as session, session.get(url) as response:
+                utils.raise_if_rate_limited(response)
+                response.raise_for_status()
+                await pool.observe(response.headers)
+                data = await utils.read_json(response)
 
-            all_positions.extend(positions)
+        # Handle response - it should be a list directly
+        if isinstance(data, list):
+            return [float(pos.get('totalBought', 0)) for pos in data if isinstance(pos, dict)]
+        # Some APIs return {data: [...]}
+        positions = data.get('data', []) if isinstance(data, dict) else []
+        return [float(pos.get('totalBought', 0)) for pos in positions if isinstance(pos, dict)]
 
-        # Add delay between offset requests to reduce rate limiting
-        await asyncio.sleep(0.15)
+    tasks = [asyncio.create_task(fetch_page(offset)) for offset in offsets]
+    try:
+        pages = await asyncio.gather(*tasks)
+    finally:
+        # При ошибке одной страницы не оставляем соседние висеть до следующего ретрая
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
+    all_positions = []
+    for positions in pages:
+        all_positions.extend(positions)
     return all_positions
 
 
-@utils.retry_async(retries=3, delay=1.0, backoff=2.0, exceptions=(aiohttp.ClientError, asyncio.TimeoutError))
-async def fetch_open_positions(wallet: str, sessions: List[aiohttp.ClientSession], semaphore: asyncio.Semaphore) -> Dict[str, float]:
+@utils.RETRY_DATA
+async def fetch_open_positions(wallet: str, pool: SessionPool, semaphore: utils.AdmissionController) -> Dict[str, float]:
     """Fetch open positions and return dict of asset_id -> initialValue."""
-    # Don't use semaphore here - it's controlled at higher level
     url = f"https://data-api.polymarket.com/positions?user={wallet}&sortBy=CURRENT&sortDirection=DESC&sizeThreshold=.1&limit=50&offset=0"
-    session_idx = random.randint(0, len(sessions) - 1)
-    session = sessions[session_idx]
-    # Proxy is already bound to session
-    async with session.get(url, ssl=False) as response:
-        if response.status == 429:
-            raise aiohttp.ClientResponseError(
-                response.request_info,
-                response.history,
-                status=response.status,
-                message="Rate limit exceeded",
-                headers=response.headers,
-            )
-        response.raise_for_status()
-        data = await response.json()
+    async with semaphore:
+        # Proxy is already bound to session
+        async with DATA_API_LIMITER, pool.pick() as session, session.get(url) as response:
+            utils.raise_if_rate_limited(response)
+            response.raise_for_status()
+            await pool.observe(response.headers)
+            data = await utils.read_json(response)
         
-        # Handle response - it should be a list directly
-        positions = data if isinstance(data, list) else data.get('data', [])
-        if isinstance(positions, list):
-            return {pos.get('asset', pos.get('asset_id', '')): float(pos.get('initialValue', 0)) 
-                    for pos in positions if isinstance(pos, dict)}
-        return {}
+    # Handle response - it should be a list directly
+    positions = data if isinstance(data, list) else data.get('data', [])
+    if isinstance(positions, list):
+        return {pos.get('asset', pos.get('asset_id', '')): float(pos.get('initialValue', 0)) 
+                for pos in positions if isinstance(pos, dict)}
+    return {}
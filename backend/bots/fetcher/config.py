@@ -24,6 +24,7 @@ DATA_API_BASE = "https://data-api.polymarket.com"
 LEADERBOARD_URL = "https://data-api.polymarket.com/v1/leaderboard"
 GRAPHQL_URL = "https://api.goldsky.com/api/public/project_cl6mb8i9h0003e201j6li0diw/subgraphs/positions-subgraph/0.0.7/gn"
 API_LIMIT = 500
+PAGE_PREFETCH = 4  # Сколько страниц рынков запрашивать параллельно
 REQUEST_TIMEOUT = 60  # Increased for slow proxies
 
 # Настройки кэширования
@@ -33,39 +34,41 @@ CACHE_FILE = None  # Set to file path for persistence
 OUTPUT_FILE = "polymarket_markets_with_filtered_holders.json"
 
 # Настройки прокси и ротации
+import functools
 import os
-
-# Настройки прокси и ротации
-PROXIES = []
-try:
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    proxy_file = os.path.join(base_dir, '../proxies.txt')  # backend/proxies.txt
-    if os.path.exists(proxy_file):
-        with open(proxy_file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                # Check if already formatted (starts with http or socks)
-                if line.startswith('http') or line.startswith('socks'):
-                    PROXIES.append(line)
-                    continue
-
-                # Parse host:port:user:pass format
-                parts = line.split(':')
-                if len(parts) == 4:
-                    host, port, user, password = parts
-                    formatted_proxy = f"http://{user}:{password}@{host}:{port}"
-                    PROXIES.append(formatted_proxy)
-                else:
-                    # Assume already formatted or invalid
-                    PROXIES.append(line)
-    
-    if not PROXIES:
-        PROXIES = [None]
-except Exception as e:
-    print(f"Error loading proxies: {e}")
-    PROXIES = [None]
+import ssl
+from typing import Optional, Tuple
+
+PROXY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../proxies.txt')  # backend/proxies.txt
+
+
+@functools.lru_cache(maxsize=1)
+def load_proxies() -> Tuple[Optional[str], ...]:
+    """Читает proxies.txt один раз; load_proxies.cache_clear() перечитает файл."""
+    proxies = []
+    try:
+        if os.path.exists(PROXY_FILE):
+            with open(PROXY_FILE, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    # Check if already formatted (starts with http or socks)
+                    if line.startswith(('http', 'socks')) or line.count(':') != 3:
+                        # Already formatted or invalid
+                        proxies.append(line)
+                        continue
+
+                    # Parse host:port:user:pass format
+                    host, _, rest = line.partition(':')
+                    port, _, rest = rest.partition(':')
+                    user, _, password = rest.partition(':')
+                    proxies.append(f"http://{user}:{password}@{host}:{port}")
+    except Exception as e:
+        print(f"Error loading proxies: {e}")
+        proxies = []
+
+    return tuple(proxies) or (None,)
 
 USER_AGENTS = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -86,24 +89,40 @@ USER_AGENTS = [
 ]
 
 PROXY_TIMEOUT = 10
+
+# Один SSL-контекст на все соединения: CA-бандл грузится один раз, сертификаты проверяются.
+# ALPN h2 не объявляем — aiohttp говорит только HTTP/1.1.
+SSL_CONTEXT = ssl.create_default_context()
 MAX_REQUESTS_PER_PROXY = 100
 
 # Настройки задержек (adjusted for proxies)
-DELAY_BETWEEN_REQUESTS = 0.05
 DELAY_AFTER_429 = 0.55
+PROXY_429_COOLDOWN = 5.0  # Сколько пропускать прокси после 429, если нет Retry-After
 DELAY_BETWEEN_BATCHES = 0.1
 ADAPTIVE_BACKOFF_MULTIPLIER = 2.0
 
+# Лимиты запросов в секунду (token bucket, общий на все прокси)
+GRAPHQL_RATE_LIMIT = 50
+DATA_API_RATE_LIMIT = 30
+RATE_LIMIT_LOW_REMAINING = 5  # При X-RateLimit-Remaining ниже порога подключённые контроллеры снижают параллелизм на 1
+
 # Настройки конкурентности (increased with proxies)
 # Настройки конкурентности (moderate for proxies)
 # Настройки конкурентности (moderate for proxies)
 # Настройки конкурентности (high for large proxy pool)
 # Настройки конкурентности (adjusted for Data API limits)
+# Держать MAX_CONCURRENT_* <= CONNECTOR_LIMIT_PER_HOST (services/http_sessions.py) * len(load_proxies()),
+# иначе запросы молча встают в очередь коннектора
 MAX_CONCURRENT_WALLETS = 15
 MAX_CONCURRENT_STATS = 15
 MAX_CONCURRENT_INITIAL = 15  # Matched to proxy count (15)
 MAX_CONCURRENT_DETAILED = 15
 MAX_CONCURRENT_CLOSED_POSITIONS = 5
+WALLET_STATS_BATCH_SIZE = 25  # Wallets per stats round-trip
+WALLET_STATS_WORKERS = 2  # Stats chunks processed concurrently
+WALLET_STATS_CACHE_TTL = 3600  # Seconds a cached wallet stats row stays valid (SignalStore)
+WALLET_STATS_MEMORY_CACHE_SIZE = 50_000  # In-process LRU for process_single_wallet (same TTL)
+MEDIAN_CACHE_TTL = 600  # Seconds a cached median/open positions row stays valid (SignalStore)
 
 # ===============================================================
 
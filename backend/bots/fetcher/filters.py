@@ -8,29 +8,49 @@ from .config import (
 )
 
 
+# Маска отметок: бит 1 — мало сделок, бит 0 — молодой кошелек
+_MARK_TABLE = {
+    0: lambda t, a: "OK",
+    1: lambda t, a: f"age={a}d<{MIN_WALLET_AGE_DAYS}d",
+    2: lambda t, a: f"trades={t}<{MIN_TRADES}",
+    3: lambda t, a: f"trades={t}<{MIN_TRADES} | age={a}d<{MIN_WALLET_AGE_DAYS}d",
+}
+
+
+def _mark_mask(traded_count: Optional[int], wallet_age_days: Optional[int]) -> int:
+    return (
+        ((traded_count is not None and traded_count < MIN_TRADES) << 1)
+        | (wallet_age_days is not None and wallet_age_days < MIN_WALLET_AGE_DAYS)
+    )
+
+
 def filter_wallet(
     wallet_address: str,
     balance: float,
     traded_count: Optional[int],
     vol: Optional[float],
     wallet_age_days: Optional[int]
-) -> Tuple[bool, str, bool]:
-    """Фильтрует кошелек по критериям"""
-    marks = []
-    
+) -> Tuple[bool, bool]:
+    """Фильтрует кошелек по критериям: (pass_filter, mark_special).
+
+    Текст причины — по запросу через filter_wallet_reason().
+    """
+    if (traded_count is not None and traded_count > MAX_TRADES) or (vol is not None and vol > MAX_VOL):
+        return False, False
+
+    return True, _mark_mask(traded_count, wallet_age_days) != 0
+
+
+def filter_wallet_reason(
+    traded_count: Optional[int],
+    vol: Optional[float],
+    wallet_age_days: Optional[int]
+) -> str:
+    """Текстовая причина решения filter_wallet (для логов)."""
     if traded_count is not None and traded_count > MAX_TRADES:
-        return False, f"trades={traded_count}>{MAX_TRADES}", False
+        return f"trades={traded_count}>{MAX_TRADES}"
     
     if vol is not None and vol > MAX_VOL:
-        return False, f"vol=${vol:,.0f}>${MAX_VOL:,.0f}", False
-    
-    if traded_count is not None and traded_count < MIN_TRADES:
-        marks.append(f"trades={traded_count}<{MIN_TRADES}")
-    
-    if wallet_age_days is not None and wallet_age_days < MIN_WALLET_AGE_DAYS:
-        marks.append(f"age={wallet_age_days}d<{MIN_WALLET_AGE_DAYS}d")
-    
-    has_marks = len(marks) > 0
-    reason = " | ".join(marks) if marks else "OK"
+        return f"vol=${vol:,.0f}>${MAX_VOL:,.0f}"
     
-    return True, reason, has_marks
+    return _MARK_TABLE[_mark_mask(traded_count, wallet_age_days)](traded_count, wallet_age_days)
@@ -1,26 +1,30 @@
 import asyncio
 import aiohttp
 import time
-import json
-import statistics
+import orjson
 import logging
-from typing import Dict, List, Set, Any
+from typing import Dict, List, Optional, Set, Tuple, Any
+from collections import deque
 from datetime import datetime, timezone
 import urllib3
-import random
-from itertools import cycle
-from aiohttp_socks import ProxyConnector
 
 from . import utils
 from .config import (
     API_BASE_URL,
     API_LIMIT,
+    PAGE_PREFETCH,
     REQUEST_TIMEOUT,
+    PROXY_TIMEOUT,
+    SSL_CONTEXT,
     MAX_CONCURRENT_WALLETS,
     MAX_CONCURRENT_STATS,
     MAX_CONCURRENT_INITIAL,
     MAX_CONCURRENT_DETAILED,
     MAX_CONCURRENT_CLOSED_POSITIONS,
+    WALLET_STATS_BATCH_SIZE,
+    WALLET_STATS_WORKERS,
+    WALLET_STATS_CACHE_TTL,
+    MEDIAN_CACHE_TTL,
     DELAY_BETWEEN_BATCHES,
     MIN_VOLUME,
     MAX_OUTCOME_PRICE,
@@ -31,137 +35,220 @@ from .config import (
     MIN_WALLET_AGE_DAYS,
     MIN_HOLDERS_COUNT,
     MIN_USD_VALUE,
-    PROXIES,
+    load_proxies,
     USER_AGENTS,
     MARKET_WHITELIST,
     WHITELIST_ONLY
 )
 
 from .processors import (
-    process_single_market
+    process_single_market,
+    set_holders
 )
 
-from .api_client import fetch_holders_for_assets, get_wallet_stats, fetch_closed_positions, fetch_open_positions
+from .api_client import SessionPool, fetch_holders_for_assets, batch_wallet_stats, fetch_closed_positions, fetch_open_positions
 from backend.services.signal_store import SignalStore
+from backend.services.http_sessions import build_sessions
 
 # Configure logging
 logger = logging.getLogger("fetcher")
 
+def _loads(value):
+    """Parses JSON-encoded market fields; values the API already sent decoded pass through."""
+    return orjson.loads(value) if isinstance(value, (bytes, str)) else value
+
+
 def extract_asset_ids(market: dict) -> tuple:
     """Extracts both YES and NO asset IDs from market data.
     Returns: (yes_asset_id, no_asset_id)
+    Result is cached on the market as '_asset_ids'.
     """
+    cached = market.get('_asset_ids')
+    if cached is not None:
+        return cached
+    
+    asset_ids = ("", "")
     try:
         if "clobTokenIds" in market:
             clob_token_ids_str = market["clobTokenIds"]
-            clob_token_ids = json.loads(clob_token_ids_str)
+            if (isinstance(clob_token_ids_str, str) and clob_token_ids_str.startswith('["')
+                    and clob_token_ids_str.endswith('"]') and '\\' not in clob_token_ids_str):
+                # Fast path: always a short array of digit strings, '["id1", "id2"]'
+                clob_token_ids = clob_token_ids_str[2:-2].replace('", "', '","').split('","')
+            else:
+                clob_token_ids = _loads(clob_token_ids_str)
             yes_id = clob_token_ids[0] if len(clob_token_ids) > 0 else ""
             no_id = clob_token_ids[1] if len(clob_token_ids) > 1 else ""
-            return (yes_id, no_id)
-    except (json.JSONDecodeError, KeyError, IndexError):
+            asset_ids = (yes_id, no_id)
+    except (orjson.JSONDecodeError, KeyError, IndexError):
         pass
-    return ("", "")
-
-
-def collect_unique_wallets(filtered_markets: list) -> Set[str]:
-    """Extract all unique wallet addresses from filtered markets."""
-    unique_wallets = set()
-    for market in filtered_markets:
-        holders = market.get('holders', [])
-        for holder in holders:
-            wallet_address = holder.get('address')
-            if wallet_address:
-                unique_wallets.add(wallet_address)
+    market['_asset_ids'] = asset_ids
+    return asset_ids
+
+
+def split_asset_ids(markets: List[Dict[str, Any]]) -> tuple:
+    """Single pass over markets -> (yes_ids, no_ids), skipping empty IDs."""
+    yes_ids, no_ids = [], []
+    for m in markets:
+        yes_id, no_id = extract_asset_ids(m)
+        if yes_id:
+            yes_ids.append(yes_id)
+        if no_id:
+            no_ids.append(no_id)
+    return yes_ids, no_ids
+
+
+# Wallet categories, in priority order
+REMOVE, FLAGGED_NEW, FLAGGED_FRESH, MEDIAN_CANDIDATE = range(4)
+
+
+def categorize_wallet(stats: tuple) -> int:
+    """Category of a wallet from its (traded, volume, age) stats."""
+    trades_count = stats[0] if len(stats) > 0 else 0
+    total_volume = stats[1] if len(stats) > 1 else 0
+    wallet_age = stats[2] if len(stats) > 2 else None
+    
+    # 1. Remove qualified wallets (trades > 100 AND volume > 1M)
+    if trades_count > 100 and total_volume > 1_000_000:
+        return REMOVE
+    # 2. Flag new (Age < 30)
+    if wallet_age is not None and wallet_age < 30:
+        return FLAGGED_NEW
+    # 3. Flag fresh (Trades <= 5)
+    if trades_count is not None and trades_count <= 5:
+        return FLAGGED_FRESH
+    # 4. Rest are candidates for median check
+    return MEDIAN_CANDIDATE
+
+
+async def fetch_all_wallet_stats(unique_wallets: Set[str], pool: SessionPool) -> tuple:
+    """Fetch stats for all unique wallets in chunks of WALLET_STATS_BATCH_SIZE.
+    Wallets are categorized as their stats arrive.
+    Returns: (wallet_stats, (to_remove, flagged_new, flagged_fresh, median_candidates))
+    """
+    start_time = time.time()
+    store = SignalStore()
+    categories = (set(), set(), set(), set())
     
-    logger.info(f"Collected {len(unique_wallets)} unique wallet addresses")
-    return unique_wallets
-
-
-async def fetch_all_wallet_stats(unique_wallets: Set[str], sessions: List[aiohttp.ClientSession]) -> Dict[str, tuple]:
-    """Fetch stats for all unique wallets in parallel."""
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT_INITIAL)
-
-    async def fetch_with_semaphore(wallet: str):
-        async with semaphore:
-            stats = await get_wallet_stats(sessions, wallet)
+    # Cached stats from previous runs; only misses hit the API
+    wallet_stats = store.get_wallet_stats_batch(unique_wallets, WALLET_STATS_CACHE_TTL)
+    for wallet, stats in wallet_stats.items():
+        categories[categorize_wallet(stats)].add(wallet)
+    fresh_stats = {}
+    wallets = [w for w in unique_wallets if w not in wallet_stats]
+    logger.info(f"Fetching stats for {len(wallets)} wallets ({len(wallet_stats)} cached)...")
+    chunks: asyncio.Queue = asyncio.Queue()
+    for i in range(0, len(wallets), WALLET_STATS_BATCH_SIZE):
+        chunks.put_nowait(wallets[i:i + WALLET_STATS_BATCH_SIZE])
+    
+    async def worker(controller: utils.AdmissionController):
+        # Несколько воркеров: следующий чанк стартует, пока хвост предыдущего ещё в полёте
+        while True:
+            try:
+                chunk = chunks.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            failed = await batch_wallet_stats(pool, chunk, wallet_stats, controller)
+            for wallet in chunk:
+                stats = wallet_stats[wallet]
+                categories[categorize_wallet(stats)].add(wallet)
+                if wallet not in failed:
+                    fresh_stats[wallet] = stats
             await asyncio.sleep(DELAY_BETWEEN_BATCHES)
-            return wallet, stats
     
-    logger.info(f"Fetching stats for {len(unique_wallets)} wallets...")
-    start_time = time.time()
+    # Лимит сжимается на 429 и растёт обратно на успехах
+    with pool.attach(utils.AdmissionController(MAX_CONCURRENT_STATS)) as controller:
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(WALLET_STATS_WORKERS):
+                tg.create_task(worker(controller))
     
-    results = await asyncio.gather(*[fetch_with_semaphore(w) for w in unique_wallets])
-    wallet_stats = {wallet: stats for wallet, stats in results}
+    if fresh_stats:
+        store.put_wallet_stats_batch(fresh_stats)
     
     elapsed = time.time() - start_time
     logger.info(f"Fetched stats in {elapsed:.2f}s")
-    return wallet_stats
-
-
-def filter_wallets_by_criteria(wallet_stats: Dict[str, tuple]) -> tuple[Set[str], Set[str], Set[str]]:
-    """Filter wallets into: to_remove, flagged_basic, median_candidates."""
-    to_remove = set()  # trades > 100 AND volume > 1M
-    flagged_new = set()  # age < 30
-    flagged_fresh = set()  # trades <= 5
-    median_candidates = set()  # остальные (для проверки median)
-    
-    for wallet, stats in wallet_stats.items():
-        trades_count = stats[0] if len(stats) > 0 else 0
-        total_volume = stats[1] if len(stats) > 1 else 0
-        wallet_age = stats[2] if len(stats) > 2 else None
-        
-        # 1. Remove qualified wallets
-        if trades_count > 100 and total_volume > 1_000_000:
-            to_remove.add(wallet)
-            continue
-        
-        # 2. Flag new (Age < 30)
-        if wallet_age is not None and wallet_age < 30:
-            flagged_new.add(wallet)
-            continue
-            
-        # 3. Flag fresh (Trades <= 5)
-        if trades_count is not None and trades_count <= 5:
-            flagged_fresh.add(wallet)
-            continue
-        
-        # 4. Rest are candidates for median check
-        median_candidates.add(wallet)
-    
+    to_remove, flagged_new, flagged_fresh, median_candidates = categories
     logger.info(f"To remove: {len(to_remove)}, Flagged new: {len(flagged_new)}, Flagged fresh: {len(flagged_fresh)}, Median candidates: {len(median_candidates)}")
-    return to_remove, flagged_new, flagged_fresh, median_candidates
+    return wallet_stats, categories
 
 
-async def fetch_detailed_positions(qualified_wallets: Set[str], sessions: List[aiohttp.ClientSession]) -> Dict[str, dict]:
-    """Fetch closed and open positions for qualified wallets."""
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT_CLOSED_POSITIONS)
+async def fetch_detailed_positions(
+    qualified_wallets: Set[str],
+    pool: SessionPool,
+    wallet_stats: Optional[Dict[str, tuple]] = None
+) -> Dict[str, dict]:
+    """Fetch closed and open positions for qualified wallets.
 
-    async def fetch_wallet_details(wallet: str):
-        async with semaphore:
-            closed_sizes = await fetch_closed_positions(wallet, sessions, semaphore)
-            open_positions = await fetch_open_positions(wallet, sessions, semaphore)
-            return wallet, {'closed_sizes': closed_sizes, 'open_positions': open_positions}
-    
-    logger.info(f"Fetching detailed positions for {len(qualified_wallets)} qualified wallets...")
+    With wallet_stats, wallets whose cached median was stored at the same trade
+    count are served from SignalStore as {'median', 'open_positions', 'cached'}.
+    """
+    detailed_cache = {}
+    if wallet_stats:
+        cached = SignalStore().get_wallet_medians_batch(qualified_wallets, MEDIAN_CACHE_TTL)
+        for wallet, (fingerprint, median, open_positions) in cached.items():
+            if fingerprint == wallet_stats.get(wallet, (None,))[0]:
+                detailed_cache[wallet] = {'median': median, 'open_positions': open_positions, 'cached': True}
+        if detailed_cache:
+            logger.info(f"Reusing cached medians for {len(detailed_cache)} wallets")
+    
+    # MAX_CONCURRENT_CLOSED_POSITIONS workers drain the wallet queue (O(workers) tasks, not O(wallets)).
+    # Separate per-request bound, adaptive: shrinks on 429, grows back on success.
+    request_controller = utils.AdmissionController(MAX_CONCURRENT_DETAILED)
+    wallets: asyncio.Queue = asyncio.Queue()
+    for wallet in qualified_wallets:
+        if wallet not in detailed_cache:
+            wallets.put_nowait(wallet)
+
+    async def worker():
+        while True:
+            try:
+                wallet = wallets.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            closed_sizes = await fetch_closed_positions(wallet, pool, request_controller)
+            open_positions = await fetch_open_positions(wallet, pool, request_controller)
+            detailed_cache[wallet] = {'closed_sizes': closed_sizes, 'open_positions': open_positions}
+    
+    logger.info(f"Fetching detailed positions for {wallets.qsize()} qualified wallets...")
     start_time = time.time()
     
-    results = await asyncio.gather(*[fetch_wallet_details(w) for w in qualified_wallets])
-    detailed_cache = {wallet: details for wallet, details in results}
+    with pool.attach(request_controller):
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(MAX_CONCURRENT_CLOSED_POSITIONS):
+                tg.create_task(worker())
     
     elapsed = time.time() - start_time
     logger.info(f"Fetched detailed positions in {elapsed:.2f}s")
     return detailed_cache
 
 
-def compute_medians(detailed_cache: Dict[str, dict]) -> Dict[str, dict]:
-    """Compute median trade size for each qualified wallet."""
+def compute_medians(
+    detailed_cache: Dict[str, dict],
+    wallet_stats: Optional[Dict[str, tuple]] = None
+) -> Dict[str, dict]:
+    """Compute median trade size for each qualified wallet.
+
+    With wallet_stats, newly computed medians are stored in SignalStore keyed by
+    the wallet's trade count, so the next run can skip the positions requests.
+    """
     qualified_cache = {}
+    to_store = {}
     
     for wallet, details in detailed_cache.items():
+        if details.get('cached'):
+            qualified_cache[wallet] = {
+                'median': details['median'],
+                'open_positions': details.get('open_positions', {})
+            }
+            continue
+        
         closed_sizes = details.get('closed_sizes', [])
         
         if closed_sizes:
-            median = statistics.median(closed_sizes)
+            # sorted+index: statistics.median's type coercion dominates on plain floats
+            s = sorted(closed_sizes)
+            n = len(s)
+            median = s[n // 2] if n & 1 else 0.5 * (s[n // 2 - 1] + s[n // 2])
         else:
             median = 0.0  # Default for wallets with no closed positions
         
@@ -169,6 +256,11 @@ def compute_medians(detailed_cache: Dict[str, dict]) -> Dict[str, dict]:
             'median': median,
             'open_positions': details.get('open_positions', {})
         }
+        if wallet_stats and wallet in wallet_stats:
+            to_store[wallet] = (wallet_stats[wallet][0], median, qualified_cache[wallet]['open_positions'])
+    
+    if to_store:
+        SignalStore().put_wallet_medians_batch(to_store)
     
     logger.info(f"Computed medians for {len(qualified_cache)} qualified wallets")
     return qualified_cache
@@ -178,7 +270,7 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 
 @utils.retry_async(retries=3, delay=1, backoff=2, exceptions=(aiohttp.ClientError, asyncio.TimeoutError))
-async def fetch_market_page(session: aiohttp.ClientSession, offset: int, limit: int) -> List[Dict[str, Any]]:
+async def fetch_market_page(pool: SessionPool, offset: int, limit: int) -> List[Dict[str, Any]]:
     """Fetches a single page of markets with retry logic."""
     params = {
         "closed": "false",
@@ -188,18 +280,104 @@ async def fetch_market_page(session: aiohttp.ClientSession, offset: int, limit:
     }
     print(f"📡 Запрос рынков: offset={offset}...")
     # Proxy is already bound to session
-    async with session.get(API_BASE_URL, params=params, ssl=False) as response:
+    async with pool.pick() as session, session.get(API_BASE_URL, params=params) as response:
+        utils.raise_if_rate_limited(response)
         response.raise_for_status()
-        return await response.json()
+        return await utils.read_json(response)
+
+
+def _parse_prices(market: Dict[str, Any]) -> tuple:
+    """Returns (price_yes, price_no) from outcomePrices, which might be string or list."""
+    price_yes = 0
+    price_no = 0
+    if "outcomePrices" in market:
+        outcome_prices = _loads(market["outcomePrices"])
+        if outcome_prices:
+            price_yes = float(outcome_prices[0])
+            price_no = float(outcome_prices[1]) if len(outcome_prices) > 1 else 1 - price_yes
+    return price_yes, price_no
+
+
+def _is_floor_price(price_yes: float, price_no: float) -> bool:
+    # Floor price (Low Probability)
+    # User requested: "equal 0.001". Using <= 0.001 to catch tiny prices.
+    return price_yes <= 0.001 or price_no <= 0.001
+
+
+def _prepare_market(market: Dict[str, Any], price_yes: float, price_no: float) -> None:
+    """Annotates a selected market with prices, floor flag, outcome names, event slug and asset IDs."""
+    # Store both outcome prices
+    market['_price_yes'] = price_yes
+    market['_price_no'] = price_no
+    market['_price'] = price_yes  # Keep for backward compat
+    market['is_floor_price'] = _is_floor_price(price_yes, price_no)  # Flag for processing
+    
+    # Parse outcome names
+    outcomes = _loads(market.get('outcomes', '[]'))
+    market['_outcome_yes'] = outcomes[0] if len(outcomes) > 0 else 'Yes'
+    market['_outcome_no'] = outcomes[1] if len(outcomes) > 1 else 'No'
+    market['_outcome'] = market['_outcome_yes']  # Keep for backward compat
+    
+    event_slug = ""
+    try:
+        events = market.get("events")
+        if isinstance(events, list) and len(events) > 0:
+            event_slug = events[0].get("slug", "")
+    except Exception:
+        pass
+    market['_event_slug'] = event_slug
+    
+    extract_asset_ids(market)
+
+
+def filter_market(
+    market: Dict[str, Any],
+    current_date: datetime,
+    min_volume: float,
+    max_outcome_price: float,
+    min_outcome_price: float
+) -> bool:
+    """Applies market filters; on success annotates the market with parsed prices/outcomes."""
+    passed = False
+    try:
+        # endDate applies to every market (floor included): check it before any JSON parsing
+        end_date_str = market.get("endDate", "")
+        if not end_date_str:
+            return False
+        if datetime.fromisoformat(end_date_str.replace('Z', '+00:00')) < current_date:
+            return False
+        
+        price_yes, price_no = _parse_prices(market)
+        volume = float(market.get("volume", 0))
+        
+        # Apply limits only if NOT floor price
+        if not _is_floor_price(price_yes, price_no):
+            if volume <= min_volume:
+                return False
+            
+            # Filter by YES price (primary outcome)
+            if price_yes <= min_outcome_price or price_yes >= max_outcome_price:
+                return False
+
+        passed = True
+        # Outcome names etc. are parsed only for markets that passed
+        _prepare_market(market, price_yes, price_no)
+        return True
+        
+    except Exception as e:
+        # logger.debug(f"Skipping market due to error: {e}")
+        return passed
 
 
 async def fetch_filtered_markets(
-    sessions: List[aiohttp.ClientSession],
+    pool: SessionPool,
     min_volume: float = MIN_VOLUME,
     max_outcome_price: float = MAX_OUTCOME_PRICE,
     min_outcome_price: float = MIN_OUTCOME_PRICE
-) -> List[Dict[str, Any]]:
-    """Phase 1: Fetch and filter markets with holders"""
+) -> Tuple[List[Dict[str, Any]], Set[str]]:
+    """Phase 1: Fetch and filter markets with holders.
+    Returns (markets, unique holder wallets that passed the USD filter).
+    """
     
     logger.info("=" * 70)
     logger.info("Starting Polymarket Fetcher with optimizations")
@@ -207,198 +385,143 @@ async def fetch_filtered_markets(
     logger.info(f"Filters: trades≤{MAX_TRADES}, vol≤${MAX_VOL:,.0f}, age≥{MIN_WALLET_AGE_DAYS}d")
     logger.info("=" * 70)
     
-    # Fetch and filter markets with pagination on-the-fly
+    # Fetch and filter markets with pagination on-the-fly:
+    # producer keeps PAGE_PREFETCH page requests in flight, consumer filters pages in order
     filtered_markets = []
     current_date = datetime.now(timezone.utc)
-    offset = 0
+    queue: asyncio.Queue = asyncio.Queue(maxsize=PAGE_PREFETCH)
     
-    while True:
+    async def produce_pages():
+        pending = deque()
+        next_offset = 0
         try:
-            session_idx = random.randint(0, len(sessions) - 1)
-            session = sessions[session_idx]
-            markets = await fetch_market_page(session, offset, API_LIMIT)
-        except Exception as e:
-            logger.error(f"Failed to load markets page (offset={offset}) after retries. Error: {e}")
-            break
-
-        if not markets:
-            logger.info("Reached end of data.")
-            break
-        
-        page_filtered = 0
-        for market in markets:
-            try:
-                # Use market slug
-                # market['slug'] is already in the market object
-                
-                # Check for floor price (Low Probability)
-                # ... rest of logic ...
-                price_yes = 0
-                price_no = 0
+            while True:
+                while len(pending) < PAGE_PREFETCH:
+                    pending.append((next_offset, asyncio.create_task(fetch_market_page(pool, next_offset, API_LIMIT))))
+                    next_offset += API_LIMIT
                 
-                # Handle outcomePrices which might be string or list
-                if "outcomePrices" in market:
-                    op = market["outcomePrices"]
-                    outcome_prices = json.loads(op) if isinstance(op, str) else op
-                    if outcome_prices:
-                         price_yes = float(outcome_prices[0])
-                         price_no = float(outcome_prices[1]) if len(outcome_prices) > 1 else 1 - price_yes
-
-                volume = float(market.get("volume", 0))
-                
-                # Check for floor price (Low Probability)
-                # User requested: "equal 0.001". Using <= 0.001 to catch tiny prices.
-                is_floor_price = False
-                if price_yes <= 0.001 or price_no <= 0.001:
-                    is_floor_price = True
-                
-                # Apply limits only if NOT floor price
-                if not is_floor_price:
-                    if volume <= min_volume:
-                        continue
-                    
-                    # Filter by YES price (primary outcome)
-                    if price_yes <= min_outcome_price or price_yes >= max_outcome_price:
-                        continue
+                offset, task = pending.popleft()
+                try:
+                    markets = await task
+                except Exception as e:
+                    logger.error(f"Failed to load markets page (offset={offset}) after retries. Error: {e}")
+                    break
                 
-                end_date_str = market.get("endDate", "")
-                if end_date_str:
-                    end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
-                    if end_date < current_date:
-                        continue
-                else:
-                    continue
-
-                filtered_markets.append(market)
-                # Store both outcome prices
-                market['_price_yes'] = price_yes
-                market['_price_no'] = price_no
-                market['_price'] = price_yes  # Keep for backward compat
-                market['is_floor_price'] = is_floor_price # Flag for processing
+                if not markets:
+                    logger.info("Reached end of data.")
+                    break
                 
-                # Parse outcome names
-                outcomes_raw = market.get('outcomes', '[]')
-                outcomes = json.loads(outcomes_raw) if isinstance(outcomes_raw, str) else outcomes_raw
-                market['_outcome_yes'] = outcomes[0] if len(outcomes) > 0 else 'Yes'
-                market['_outcome_no'] = outcomes[1] if len(outcomes) > 1 else 'No'
-                market['_outcome'] = market['_outcome_yes']  # Keep for backward compat
-                page_filtered += 1
+                await queue.put(markets)
                 
-            except Exception as e:
-                # logger.debug(f"Skipping market due to error: {e}")
-                continue
-        
-        logger.debug(f"Page: {len(markets)} markets, filtered: {page_filtered} (total: {len(filtered_markets)})")
-        
-        if len(markets) < API_LIMIT:
-            logger.info("Last page received.")
-            break
-        
-        offset += API_LIMIT
-        await asyncio.sleep(0.1)
+                if len(markets) < API_LIMIT:
+                    logger.info("Last page received.")
+                    break
+        finally:
+            # Страницы за концом данных не нужны
+            for _, task in pending:
+                task.cancel()
+            await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+            await queue.put(None)
+    
+    async def consume_pages():
+        while (markets := await queue.get()) is not None:
+            page_filtered = 0
+            for market in markets:
+                if filter_market(market, current_date, min_volume, max_outcome_price, min_outcome_price):
+                    filtered_markets.append(market)
+                    page_filtered += 1
+            
+            logger.debug(f"Page: {len(markets)} markets, filtered: {page_filtered} (total: {len(filtered_markets)})")
+    
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(produce_pages())
+        tg.create_task(consume_pages())
     
     logger.info(f"Found {len(filtered_markets)} markets matching criteria")
     
-    # Extract event_slug for all filtered markets
-    for market in filtered_markets:
-        event_slug = ""
-        try:
-            if "events" in market:
-                events = market["events"]
-                if isinstance(events, list) and len(events) > 0:
-                    event_slug = events[0].get("slug", "")
-        except Exception:
-            pass
-        market['_event_slug'] = event_slug
-    
-    # Fetch holders using batch GraphQL - Sequential: YES first, then NO
-    # Fetch holders using batch GraphQL - Sequential: YES first, then NO
-    logger.info("Fetching YES outcome holders...")
-    
-    # Phase 1a: YES outcome holders - Split into Normal (300) and Floor (20)
-    normal_markets = [m for m in filtered_markets if not m.get('is_floor_price', False)]
-    floor_markets = [m for m in filtered_markets if m.get('is_floor_price', False)]
-    
-    # YES - Normal
-    yes_ids_normal = [extract_asset_ids(m)[0] for m in normal_markets if extract_asset_ids(m)[0]]
-    yes_results_normal = await fetch_holders_for_assets(sessions, yes_ids_normal, limit=300)
-    
-    # YES - Floor (Limit 20)
-    yes_ids_floor = [extract_asset_ids(m)[0] for m in floor_markets if extract_asset_ids(m)[0]]
-    if yes_ids_floor:
-        logger.info(f"Fetching Top 20 holders for {len(yes_ids_floor)} low-prob markets (YES) with batch_size=5...")
-    yes_results_floor = await fetch_holders_for_assets(sessions, yes_ids_floor, limit=20, batch_size=5)
+    # Fetch holders using batch GraphQL - YES and NO, normal and floor, concurrently
+    logger.info("Fetching YES/NO outcome holders...")
+    
+    # Phase 1: Split into Normal (300) and Floor (20)
+    # Single pass: floor/normal partition + YES/NO asset IDs
+    yes_ids_normal, no_ids_normal, yes_ids_floor, no_ids_floor = [], [], [], []
+    for m in filtered_markets:
+        yes_id, no_id = extract_asset_ids(m)
+        if m.get('is_floor_price', False):
+            if yes_id:
+                yes_ids_floor.append(yes_id)
+            if no_id:
+                no_ids_floor.append(no_id)
+        else:
+            if yes_id:
+                yes_ids_normal.append(yes_id)
+            if no_id:
+                no_ids_normal.append(no_id)
+    
+    if yes_ids_floor or no_ids_floor:
+        logger.info(f"Fetching Top 20 holders for {len(yes_ids_floor)}/{len(no_ids_floor)} low-prob markets (YES/NO) with batch_size=5...")
+    
+    # Normal markets: top 300, floor markets: top 20. No data dependency between the four calls.
+    # fetch_holders_for_assets returns {} immediately for an empty id list.
+    yes_results_normal, yes_results_floor, no_results_normal, no_results_floor = await asyncio.gather(
+        fetch_holders_for_assets(pool, yes_ids_normal, limit=300),
+        fetch_holders_for_assets(pool, yes_ids_floor, limit=20, batch_size=5),
+        fetch_holders_for_assets(pool, no_ids_normal, limit=300),
+        fetch_holders_for_assets(pool, no_ids_floor, limit=20, batch_size=5),
+    )
     
     # Merge YES results
     yes_holders_results = {**yes_results_normal, **yes_results_floor}
-
-    logger.info("Fetching NO outcome holders...")
-    
-    # Phase 1b: NO outcome holders - Split into Normal (300) and Floor (20)
-    # NO - Normal
-    no_ids_normal = [extract_asset_ids(m)[1] for m in normal_markets if extract_asset_ids(m)[1]]
-    no_results_normal = await fetch_holders_for_assets(sessions, no_ids_normal, limit=300)
-    
-    # NO - Floor (Limit 20)
-    no_ids_floor = [extract_asset_ids(m)[1] for m in floor_markets if extract_asset_ids(m)[1]]
-    if no_ids_floor:
-        logger.info(f"Fetching Top 20 holders for {len(no_ids_floor)} low-prob markets (NO) with batch_size=5...")
-    no_results_floor = await fetch_holders_for_assets(sessions, no_ids_floor, limit=20, batch_size=5)
     
     # Merge NO results
     no_holders_results = {**no_results_normal, **no_results_floor}
     
-    market_holders = {}
+    kept_count = 0
+    unique_wallets: Set[str] = set()
     skipped_count = 0
     
     for market in filtered_markets:
+        is_floor = market.get('is_floor_price', False)
         yes_id, no_id = extract_asset_ids(market)
         price_yes = market.get('_price_yes', 0)
         price_no = market.get('_price_no', 0)
-        
-        # Process YES holders
         yes_holders = yes_holders_results.get(yes_id, {})
-        valid_yes_holders = {}
-        for wallet, balance in yes_holders.items():
-            usd_value = balance * price_yes
-            # Bypass MIN_USD_VALUE for floor markets
-            if market.get('is_floor_price', False) or usd_value >= MIN_USD_VALUE:
-                valid_yes_holders[wallet] = balance
-        
-        # Process NO holders
         no_holders = no_holders_results.get(no_id, {})
-        valid_no_holders = {}
-        for wallet, balance in no_holders.items():
-            usd_value = balance * price_no
+        
+        if is_floor:
             # Bypass MIN_USD_VALUE for floor markets
-            if market.get('is_floor_price', False) or usd_value >= MIN_USD_VALUE:
-                valid_no_holders[wallet] = balance
+            # set_holders copies into lists, so the fetched dicts can be used as-is
+            valid_yes_holders = yes_holders
+            valid_no_holders = no_holders
+        else:
+            # balance * price >= MIN_USD_VALUE  <=>  balance >= MIN_USD_VALUE / price
+            threshold_yes = MIN_USD_VALUE / price_yes if price_yes > 0 else float('inf')
+            threshold_no = MIN_USD_VALUE / price_no if price_no > 0 else float('inf')
+            valid_yes_holders = {w: b for w, b in yes_holders.items() if b >= threshold_yes}
+            valid_no_holders = {w: b for w, b in no_holders.items() if b >= threshold_no}
         
-        # Skip if neither has enough holders
-        total_holders = len(valid_yes_holders) + len(valid_no_holders)
         # Skip if neither has enough holders (Unless floor price)
         total_holders = len(valid_yes_holders) + len(valid_no_holders)
-        if not market.get('is_floor_price', False) and total_holders < MIN_HOLDERS_COUNT:
+        if not is_floor and total_holders < MIN_HOLDERS_COUNT:
             logger.debug(f"Market {market.get('conditionId', '')[:10]}... skipped: {total_holders} total holders")
             skipped_count += 1
             continue
             
-        condition_id = market["conditionId"]
-        
         # Store both YES and NO holders separately
-        market['holders_yes'] = [{'address': w, 'balance': b} for w, b in valid_yes_holders.items()]
-        market['holders_no'] = [{'address': w, 'balance': b} for w, b in valid_no_holders.items()]
-        market['holders'] = market['holders_yes']  # Keep for backward compat
+        set_holders(market, 'yes', valid_yes_holders)
+        set_holders(market, 'no', valid_no_holders)
         market['assetID_yes'] = yes_id
         market['assetID_no'] = no_id
-        market_holders[condition_id] = {'yes': valid_yes_holders, 'no': valid_no_holders}
+        kept_count += 1
+        unique_wallets.update(valid_yes_holders)
+        unique_wallets.update(valid_no_holders)
     
-    logger.info(f"Found {len(market_holders)} markets with sufficient holders (skipped {skipped_count})")
+    logger.info(f"Found {kept_count} markets with sufficient holders (skipped {skipped_count})")
     
-    return filtered_markets
+    return filtered_markets, unique_wallets
 
 
-async def fetch_whitelist_markets(sessions: List[aiohttp.ClientSession]) -> List[Dict[str, Any]]:
+async def fetch_whitelist_markets(pool: SessionPool) -> List[Dict[str, Any]]:
     """Fetch markets from MARKET_WHITELIST by slug, bypassing standard filters."""
     if not MARKET_WHITELIST:
         return []
@@ -408,51 +531,21 @@ async def fetch_whitelist_markets(sessions: List[aiohttp.ClientSession]) -> List
     
     for slug in MARKET_WHITELIST:
         try:
-            session = random.choice(sessions)
             url = f"https://gamma-api.polymarket.com/markets/slug/{slug}"
             
-            async with session.get(url, ssl=False) as response:
+            async with pool.pick() as session, session.get(url) as response:
                 if response.status != 200:
                     logger.warning(f"Whitelist market '{slug}' not found (status {response.status})")
                     continue
                 
-                market = await response.json()
+                market = await utils.read_json(response)
                 if not market:
                     continue
                 
-                # Parse outcome prices and set both YES/NO prices
-                outcome_prices = json.loads(market.get("outcomePrices", "[]"))
-                price_yes = float(outcome_prices[0]) if outcome_prices else 0
-                price_no = float(outcome_prices[1]) if len(outcome_prices) > 1 else 1 - price_yes
-                market['_price_yes'] = price_yes
-                market['_price_no'] = price_no
-                market['_price'] = price_yes  # Keep for backward compat
-                
-                outcomes_raw = market.get('outcomes', '[]')
-                outcomes = json.loads(outcomes_raw) if isinstance(outcomes_raw, str) else outcomes_raw
-                market['_outcome_yes'] = outcomes[0] if len(outcomes) > 0 else 'Yes'
-                market['_outcome_no'] = outcomes[1] if len(outcomes) > 1 else 'No'
-                market['_outcome'] = market['_outcome_yes']  # Keep for backward compat
-                
-                # Check for floor price (Low Probability)
-                is_floor_price = False
-                if price_yes <= 0.001 or price_no <= 0.001:
-                    is_floor_price = True
-                market['is_floor_price'] = is_floor_price
-                
+                price_yes, price_no = _parse_prices(market)
+                _prepare_market(market, price_yes, price_no)
                 whitelist_markets.append(market)
                 
-                # Extract event_slug
-                event_slug = ""
-                try:
-                    if "events" in market:
-                        events = market["events"]
-                        if isinstance(events, list) and len(events) > 0:
-                            event_slug = events[0].get("slug", "")
-                except Exception:
-                    pass
-                market['_event_slug'] = event_slug
-                
                 logger.info(f"✓ Loaded whitelist market: {market.get('question', slug)[:60]}")
                 
         except Exception as e:
@@ -460,35 +553,23 @@ async def fetch_whitelist_markets(sessions: List[aiohttp.ClientSession]) -> List
     
     # Fetch holders for whitelist markets - both YES and NO
     if whitelist_markets:
-        yes_ids = [extract_asset_ids(m)[0] for m in whitelist_markets if extract_asset_ids(m)[0]]
-        no_ids = [extract_asset_ids(m)[1] for m in whitelist_markets if extract_asset_ids(m)[1]]
+        yes_ids, no_ids = split_asset_ids(whitelist_markets)
         
         if yes_ids or no_ids:
             logger.info(f"Fetching holders for whitelist markets...")
-            yes_holders = await fetch_holders_for_assets(sessions, yes_ids) if yes_ids else {}
-            no_holders = await fetch_holders_for_assets(sessions, no_ids) if no_ids else {}
+            yes_holders, no_holders = await asyncio.gather(
+                fetch_holders_for_assets(pool, yes_ids),
+                fetch_holders_for_assets(pool, no_ids),
+            )
             
             for market in whitelist_markets:
                 yes_id, no_id = extract_asset_ids(market)
                 
-                # YES holders
-                if yes_id and yes_id in yes_holders:
-                    holders = yes_holders[yes_id]
-                    market['holders_yes'] = [{'address': w, 'balance': b} for w, b in holders.items()]
-                else:
-                    market['holders_yes'] = []
-                
-                # NO holders
-                if no_id and no_id in no_holders:
-                    holders = no_holders[no_id]
-                    market['holders_no'] = [{'address': w, 'balance': b} for w, b in holders.items()]
-                else:
-                    market['holders_no'] = []
-                
-                market['holders'] = market['holders_yes']  # Keep for backward compat
+                set_holders(market, 'yes', yes_holders.get(yes_id, {}) if yes_id else {})
+                set_holders(market, 'no', no_holders.get(no_id, {}) if no_id else {})
                 market['assetID_yes'] = yes_id
                 market['assetID_no'] = no_id
-                logger.info(f"  → {len(market['holders_yes'])}/{len(market['holders_no'])} holders for {market.get('question', '')[:40]}")
+                logger.info(f"  → {len(market['holders_yes_addrs'])}/{len(market['holders_no_addrs'])} holders for {market.get('question', '')[:40]}")
     
     return whitelist_markets
 
@@ -502,6 +583,12 @@ def output_json(processed_markets: List[dict]):
     # Cleanup old history entries
     store.cleanup_old_history()
     
+    # One query for all baselines, one transaction for all snapshots
+    baselines = store.get_baseline_counts_batch(
+        [m['conditionId'] for m in processed_markets if 'conditionId' in m], current_time
+    )
+    snapshots = []
+    
     # Keep only essential fields
     markets_dict = {}
     for m in processed_markets:
@@ -517,11 +604,11 @@ def output_json(processed_markets: List[dict]):
         no_count = len(holders_no) if isinstance(holders_no, dict) else len(holders_no) if isinstance(holders_no, list) else 0
         sus_count = yes_count + no_count
         
-        # Record current snapshot with separate YES/NO counts
-        store.record_holder_count(condition_id, sus_count, current_time, yes_count, no_count)
+        # Current snapshot with separate YES/NO counts
+        snapshots.append((condition_id, sus_count, current_time, yes_count, no_count))
         
-        # Compute 24h gain (returns tuple: total, yes, no)
-        baseline_total, baseline_yes, baseline_no = store.get_baseline_count(condition_id, current_time)
+        # Compute 24h gain (total, yes, no); with no history the snapshot itself is the baseline
+        baseline_total, baseline_yes, baseline_no = baselines.get(condition_id, (sus_count, yes_count, no_count))
         sus_gain_24h = sus_count - baseline_total
         sus_gain_24h_yes = yes_count - baseline_yes
         sus_gain_24h_no = no_count - baseline_no
@@ -535,7 +622,7 @@ def output_json(processed_markets: List[dict]):
             'event_slug': m.get('_event_slug', ''),
             # YES outcome data
             'price_yes': float(m.get('_price_yes', m.get('_price', 0))),
-            'assetID_yes': m.get('assetID_yes', m.get('assetID', '')),
+            'assetID_yes': m.get('assetID_yes', ''),
             'holders_yes': holders_yes,
             # NO outcome data
             'price_no': float(m.get('_price_no', 0)),
@@ -544,7 +631,7 @@ def output_json(processed_markets: List[dict]):
             # Backward compat (deprecated)
             'price': float(m.get('_price_yes', m.get('_price', 0))),
             'outcome': m.get('_outcome', 'Yes'),
-            'assetID': m.get('assetID_yes', m.get('assetID', '')),
+            'assetID': m.get('assetID_yes', ''),
             'holders': holders_yes,  # Keep YES as default
             # 24h growth - separate YES/NO
             'sus_gain_24h': sus_gain_24h,
@@ -552,6 +639,8 @@ def output_json(processed_markets: List[dict]):
             'sus_gain_24h_no': sus_gain_24h_no
         }
     
+    store.record_holder_counts_batch(snapshots)
+    
     # Save to SignalStore instead of file
     try:
         data_to_save = list(markets_dict.values())
@@ -566,79 +655,50 @@ async def run_fetcher():
     overall_start = time.time()
     
     # Create proxy sessions pool
-    sessions = []
-    
-    # Ensure we have enough user agents
-    agents_to_use = []
-    while len(agents_to_use) < len(PROXIES):
-        agents_to_use.extend(USER_AGENTS)
-    agents_to_use = agents_to_use[:len(PROXIES)]
-    
-    for proxy_url, ua in zip(PROXIES, agents_to_use):
-        proxy_timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT, connect=30)
-        proxy_headers = {'User-Agent': ua}
-        
-        connector = None
-        if proxy_url:
-            if proxy_url.startswith('socks'):
-                connector = ProxyConnector.from_url(proxy_url, limit=10, ssl=False, rdns=False)
-            elif proxy_url.startswith('http'):
-                connector = ProxyConnector.from_url(proxy_url, limit=10, ssl=False, rdns=False)
-            else:
-                # Fallback for unformatted or other types, though ProxyConnector handles most
-                connector = aiohttp.TCPConnector(limit=10, ssl=False)
-        else:
-            connector = aiohttp.TCPConnector(limit=10, ssl=False)
-
-        proxy_session = aiohttp.ClientSession(
-            timeout=proxy_timeout,
-            connector=connector,
-            headers=proxy_headers
-        )
-        sessions.append(proxy_session)
+    sessions = build_sessions(
+        load_proxies(),
+        USER_AGENTS,
+        timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT, sock_connect=PROXY_TIMEOUT),
+        ssl_context=SSL_CONTEXT,
+    )
+    pool = SessionPool(sessions)
     
     try:
         # Phase 1: Fetch markets (skip if WHITELIST_ONLY)
         if WHITELIST_ONLY:
             logger.info("Phase 1: WHITELIST_ONLY mode - skipping regular market fetch")
-            filtered_markets = []
+            filtered_markets, unique_wallets = [], set()
         else:
             logger.info("Phase 1: Fetching filtered markets...")
             start = time.time()
-            filtered_markets = await fetch_filtered_markets(sessions)
+            filtered_markets, unique_wallets = await fetch_filtered_markets(pool)
             logger.info(f"Fetched {len(filtered_markets)} markets in {time.time()-start:.2f}s")
         
         # Phase 1.5: Fetch whitelist markets (bypass filters)
-        whitelist_markets = await fetch_whitelist_markets(sessions)
+        whitelist_markets = await fetch_whitelist_markets(pool)
         if whitelist_markets:
             # Avoid duplicates by conditionId
             existing_ids = {m.get('conditionId') for m in filtered_markets}
             for wm in whitelist_markets:
                 if wm.get('conditionId') not in existing_ids:
                     filtered_markets.append(wm)
+                    unique_wallets.update(wm.get('holders_yes_addrs', ()))
+                    unique_wallets.update(wm.get('holders_no_addrs', ()))
             logger.info(f"Added {len(whitelist_markets)} whitelist markets (total: {len(filtered_markets)})")
         
-        # Phase 2: Collect unique wallets
-        logger.info("Phase 2: Collecting unique wallets...")
-        start = time.time()
-        unique_wallets = collect_unique_wallets(filtered_markets)
-        logger.info(f"Collected {len(unique_wallets)} unique wallets in {time.time()-start:.2f}s")
-        
-        # Phase 3: Fetch initial stats
-        logger.info("Phase 3: Fetching wallet stats...")
-        wallet_stats = await fetch_all_wallet_stats(unique_wallets, sessions)
+        logger.info(f"Collected {len(unique_wallets)} unique wallet addresses")
         
-        # Phase 4: Categorize wallets
-        logger.info("Phase 4: Categorizing wallets...")
-        to_remove, flagged_new, flagged_fresh, median_candidates = filter_wallets_by_criteria(wallet_stats)
+        # Phase 3-4: Fetch initial stats and categorize wallets
+        logger.info("Phase 3: Fetching and categorizing wallet stats...")
+        wallet_stats, (to_remove, flagged_new, flagged_fresh, median_candidates) = await fetch_all_wallet_stats(unique_wallets, pool)
         
         # Phase 5: Fetch detailed positions for median candidates
         logger.info("Phase 5: Fetching detailed positions for median candidates...")
-        detailed_cache = await fetch_detailed_positions(median_candidates, sessions)
+        detailed_cache = await fetch_detailed_positions(median_candidates, pool, wallet_stats)
         
         # Phase 6: Compute medians for median candidates
         logger.info("Phase 6: Computing medians...")
-        median_cache = compute_medians(detailed_cache)
+        median_cache = compute_medians(detailed_cache, wallet_stats)
         
         # Phase 7: Processing markets
         logger.info("Phase 7: Processing markets...")
@@ -659,7 +719,7 @@ async def run_fetcher():
         logger.info(f"Processed {len(processed_markets)} markets in {time.time()-start:.2f}s")
         
         # Filter out markets with empty holders
-        processed_markets = [m for m in processed_markets if len(m.get('holders', {})) > 0]
+        processed_markets = [m for m in processed_markets if len(m.get('holders_yes', {})) > 0]
         logger.info(f"After filtering empty holders: {len(processed_markets)} markets")
         
         # Output JSON
@@ -672,7 +732,7 @@ async def run_fetcher():
         logger.info("=" * 70)
         
         # Display summary statistics
-        total_flagged = sum(len(m.get('holders', {})) for m in processed_markets)
+        total_flagged = sum(len(m.get('holders_yes', {})) for m in processed_markets)
         logger.info(f"Markets analyzed: {len(processed_markets)}")
         logger.info(f"Flagged holders: {total_flagged}")
     finally:
@@ -1,36 +1,64 @@
 import asyncio
-import aiohttp
-import json
-from typing import Dict, Optional, Tuple, Any
+import logging
+import orjson
+from typing import Dict, Iterable, Optional, Tuple, Union, Any
 
+from . import utils
 from .config import (
-    MIN_HOLDERS_COUNT
+    MIN_HOLDERS_COUNT,
+    WALLET_STATS_CACHE_TTL,
+    WALLET_STATS_MEMORY_CACHE_SIZE
 )
 
 from .api_client import (
-    get_wallet_stats,
+    SessionPool,
+    batch_wallet_stats,
     fetch_holders_for_asset
 )
 
+from backend.services.http_sessions import CONNECTOR_LIMIT_PER_HOST
+
 from .filters import (
-    filter_wallet
+    filter_wallet,
+    filter_wallet_reason
 )
 
 
+logger = logging.getLogger("fetcher")
+
+# (traded, vol, age) по кошельку между вызовами; .clear() для ручной инвалидации
+WALLET_STATS_CACHE = utils.TTLCache(WALLET_STATS_MEMORY_CACHE_SIZE, WALLET_STATS_CACHE_TTL)
+
+# Holder key prefixes; part of the output format (frontend MarketGrid/MarketDetailPanel parse them)
+FLAG_NEW = '⚠️'
+FLAG_FRESH = '🌱'
+FLAG_MEDIAN = '☎️'
+FLAG_TOP = '⭐'
+
+
 async def process_single_wallet(
-    session: aiohttp.ClientSession,
+    pool: SessionPool,
     wallet_address: str,
     balance: float,
-    cache: Optional[Dict[str, Tuple[Optional[int], Optional[float], Optional[int]]]] = None
-) -> Optional[Tuple[str, float, dict]]:
-    """Обрабатывает один кошелек"""
+    cache: Union[Dict[str, tuple], utils.TTLCache, None] = None
+) -> Optional[Tuple[str, float, dict, bool]]:
+    """Обрабатывает один кошелек. Возвращает (wallet_key, balance, stats, mark_special).
+    cache по умолчанию — WALLET_STATS_CACHE; успешно полученная статистика записывается в него.
+    """
+    if cache is None:
+        cache = WALLET_STATS_CACHE
     try:
-        if cache and wallet_address in cache:
-            traded, vol, age = cache[wallet_address]
-        else:
-            traded, vol, age = await get_wallet_stats(session, wallet_address)
+        wallet_stats = cache.get(wallet_address)
+        if wallet_stats is None:
+            fetched = {}
+            failed = await batch_wallet_stats(pool, [wallet_address], fetched)
+            wallet_stats = fetched[wallet_address]
+            if not failed:
+                # Фолбэк-значения упавших запросов не кэшируем
+                cache[wallet_address] = wallet_stats
+        traded, vol, age = wallet_stats
         
-        pass_filter, reason, mark_special = filter_wallet(
+        pass_filter, mark_special = filter_wallet(
             wallet_address,
             balance,
             traded,
@@ -38,48 +66,48 @@ async def process_single_wallet(
             age
         )
         
+        # Пер-кошельковый вывод только на DEBUG: не форматируем строки и не пишем в stdout в горячем цикле
+        verbose = logger.isEnabledFor(logging.DEBUG)
         if not pass_filter:
-            print(f"    ✗ {wallet_address[:10]}... {reason} - УДАЛЕН")
+            if verbose:
+                logger.debug(f"    ✗ {wallet_address[:10]}... {filter_wallet_reason(traded, vol, age)} - УДАЛЕН")
             return None
         
         wallet_key = wallet_address
         if mark_special:
-            wallet_key = f"⚠️{wallet_address}"
-            print(f"    ⚠️  {wallet_address[:10]}... {reason} - ПОМЕЧЕН")
-        else:
-            print(f"    ✓ {wallet_address[:10]}... {reason}")
+            wallet_key = FLAG_NEW + wallet_address
+            if verbose:
+                logger.debug(f"    ⚠️  {wallet_address[:10]}... {filter_wallet_reason(traded, vol, age)} - ПОМЕЧЕН")
+        elif verbose:
+            logger.debug(f"    ✓ {wallet_address[:10]}... OK")
         
         stats = {
             'traded': traded,
             'vol': vol,
             'age': age,
-            'filtered_by': None if pass_filter else reason
+            'filtered_by': None
         }
         
-        return (wallet_key, balance, stats)
+        return (wallet_key, balance, stats, mark_special)
         
     except Exception:
         return None
 
 
 async def process_market_holders(
-    session: aiohttp.ClientSession,
+    pool: SessionPool,
     holders: Dict[str, float],
-    semaphore: asyncio.Semaphore,
-    cache: Optional[Dict[str, Tuple[Optional[int], Optional[float], Optional[int]]]] = None
+    semaphore: Optional[asyncio.Semaphore] = None,
+    cache: Union[Dict[str, tuple], utils.TTLCache, None] = None
 ) -> Tuple[dict, dict]:
-    """Обрабатывает всех холдеров маркета параллельно"""
-    
-    async def process_with_semaphore(wallet_address, balance):
-        async with semaphore:
-            return await process_single_wallet(session, wallet_address, balance, cache)
-    
-    tasks = [
-        process_with_semaphore(wallet_address, balance)
-        for wallet_address, balance in holders.items()
-    ]
-    
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    """Обрабатывает всех холдеров маркета параллельно.
+    pool — общий на весь прогон SessionPool (keep-alive сессии), а не сессия на маркет.
+    Параллелизм = число воркеров, по умолчанию из лимита коннекторов: держим его <= CONNECTOR_LIMIT_PER_HOST * len(pool),
+    иначе лишние запросы ждут свободного соединения внутри aiohttp и ловят таймауты.
+    semaphore нужен только чтобы разделить лимит между несколькими маркетами.
+    """
+    # Каждый холдер — 3 запроса (traded/volume/age)
+    workers = min(max(1, min(100, CONNECTOR_LIMIT_PER_HOST * len(pool)) // 3), len(holders))
     
     filtered_holders = {}
     stats = {
@@ -89,18 +117,113 @@ async def process_market_holders(
         'kept': 0
     }
     
-    for result in results:
-        if result and not isinstance(result, Exception):
-            wallet_key, balance, wallet_stats = result
-            filtered_holders[wallet_key] = balance
-            stats['kept'] += 1
-            
-            if wallet_key.startswith('⚠️'):
-                stats['marked'] += 1
+    # Фиксированный пул воркеров тянет из общего итератора (один event loop — гонок нет); результаты пишутся сразу
+    items = iter(holders.items())
+    
+    async def process(wallet_address, balance):
+        if semaphore is None:
+            return await process_single_wallet(pool, wallet_address, balance, cache)
+        async with semaphore:
+            return await process_single_wallet(pool, wallet_address, balance, cache)
+    
+    async def worker():
+        for wallet_address, balance in items:
+            result = await process(wallet_address, balance)
+            if result:
+                wallet_key, balance, _, mark_special = result
+                filtered_holders[wallet_key] = balance
+                stats['kept'] += 1
+                
+                if mark_special:
+                    stats['marked'] += 1
+    
+    async with asyncio.TaskGroup() as tg:
+        for _ in range(workers):
+            tg.create_task(worker())
     
     return filtered_holders, stats
 
 
+def set_holders(market: dict, side: str, holders: Dict[str, float]) -> None:
+    """Stores one side's holders as parallel address/balance lists (no per-holder dicts)."""
+    market[f'holders_{side}_addrs'] = list(holders)
+    market[f'holders_{side}_bals'] = list(holders.values())
+
+
+def holders_view(market: dict, side: str) -> Iterable[Tuple[str, float]]:
+    """Yields (address, balance) for 'yes'/'no' holders; falls back to the legacy list-of-dicts keys."""
+    addrs = market.get(f'holders_{side}_addrs')
+    if addrs is not None:
+        return zip(addrs, market[f'holders_{side}_bals'])
+    legacy = market.get('holders_yes', market.get('holders', [])) if side == 'yes' else market.get('holders_no', [])
+    return ((holder.get('address'), holder.get('balance', 0)) for holder in legacy)
+
+
+def _process_holders(
+    holders: Iterable[Tuple[str, float]],
+    price: float,
+    asset_id: str,
+    to_remove: set,
+    flagged_new: set,
+    flagged_fresh: set,
+    median_cache: Dict[str, dict],
+    wallet_stats: Dict[str, tuple],
+    bypass_filters: bool
+) -> dict:
+    """Process (address, balance) pairs of one outcome and return filtered dict.
+    Position value (USD) = balance * price is computed only for holders that are kept.
+    """
+    processed = {}
+    for wallet, balance in holders:
+        # Skip if no wallet stats available
+        if wallet not in wallet_stats:
+            continue
+
+        # 1. REMOVE qualified wallets
+        if wallet in to_remove:
+            continue
+
+        # 2. FLAG NEW criteria (age < 30) with ⚠️
+        if wallet in flagged_new:
+            wallet_key = FLAG_NEW + wallet
+            processed[wallet_key] = balance * price
+            continue
+            
+        # 3. FLAG FRESH criteria (trades <= 5) with 🌱
+        if wallet in flagged_fresh:
+            wallet_key = FLAG_FRESH + wallet
+            processed[wallet_key] = balance * price
+            continue
+
+        # 4. Check median criteria for median_candidates - flag with ☎️
+        should_flag_median = False
+        if wallet in median_cache:
+            cache_data = median_cache[wallet]
+            median = cache_data['median']
+            open_positions = cache_data['open_positions']
+
+            # Check if wallet has open position in this market
+            if asset_id in open_positions:
+                initial_value = open_positions[asset_id]
+
+                # Flag if position > 3x median
+                if median > 0 and initial_value > (3 * median):
+                    should_flag_median = True
+
+        # Only add if flagged by median criteria (skip clean wallets)
+        if should_flag_median:
+            wallet_key = FLAG_MEDIAN + wallet
+            processed[wallet_key] = balance * price
+        elif bypass_filters:
+            # If filters are bypassed, include wallet even if not flagged
+            # Use ⭐ to distinct them or just keep as is?
+            # Using ⭐ to indicate "Top Holder" in floor market
+            wallet_key = FLAG_TOP + wallet
+            processed[wallet_key] = balance * price
+    
+    return processed
+
+
 def process_single_market(market: dict, to_remove: set, flagged_new: set, flagged_fresh: set, median_cache: Dict[str, dict], wallet_stats: Dict[str, tuple], bypass_filters: bool = False) -> dict:
     """Process market with categorized wallets and median cache for both YES and NO outcomes."""
 
@@ -108,89 +231,40 @@ def process_single_market(market: dict, to_remove: set, flagged_new: set, flagge
     price_yes = market.get('_price_yes', market.get('_price', 0.0))
     price_no = market.get('_price_no', 0.0)
 
-    # Extract asset IDs for both outcomes
-    asset_id_yes = ""
-    asset_id_no = ""
-    if "clobTokenIds" in market:
-        clob_token_ids_str = market["clobTokenIds"]
-        clob_token_ids = json.loads(clob_token_ids_str)
-        if len(clob_token_ids) > 0:
-            asset_id_yes = clob_token_ids[0]
-        if len(clob_token_ids) > 1:
-            asset_id_no = clob_token_ids[1]
-
-    def process_holders(holders_list, price, asset_id):
-        """Process a list of holders and return filtered dict."""
-        processed = {}
-        for holder in holders_list:
-            wallet = holder.get('address')
-            balance = holder.get('balance', 0)
-
-            # Skip if no wallet stats available
-            if wallet not in wallet_stats:
-                continue
-
-            # 1. REMOVE qualified wallets
-            if wallet in to_remove:
-                continue
-
-            # Common calculation for value (USD)
-            position_value = balance * price
-
-            # 2. FLAG NEW criteria (age < 30) with ⚠️
-            if wallet in flagged_new:
-                wallet_key = f"⚠️{wallet}"
-                processed[wallet_key] = position_value
-                continue
-                
-            # 3. FLAG FRESH criteria (trades <= 5) with 🌱
-            if wallet in flagged_fresh:
-                wallet_key = f"🌱{wallet}"
-                processed[wallet_key] = position_value
-                continue
-
-            # 4. Check median criteria for median_candidates - flag with ☎️
-            should_flag_median = False
-            if wallet in median_cache:
-                cache_data = median_cache[wallet]
-                median = cache_data['median']
-                open_positions = cache_data['open_positions']
-
-                # Check if wallet has open position in this market
-                if asset_id in open_positions:
-                    initial_value = open_positions[asset_id]
-
-                    # Flag if position > 3x median
-                    if median > 0 and initial_value > (3 * median):
-                        should_flag_median = True
-
-            # Only add if flagged by median criteria (skip clean wallets)
-            if should_flag_median:
-                wallet_key = f"☎️{wallet}"
-                processed[wallet_key] = position_value
-            elif bypass_filters:
-                # If filters are bypassed, include wallet even if not flagged
-                # Use ⭐ to distinct them or just keep as is?
-                # Using ⭐ to indicate "Top Holder" in floor market
-                wallet_key = f"⭐{wallet}"
-                processed[wallet_key] = position_value
-        
-        return processed
+    # Extract asset IDs for both outcomes; main.extract_asset_ids memoizes them as '_asset_ids'
+    asset_ids = market.get('_asset_ids')
+    if asset_ids is None:
+        asset_id_yes = ""
+        asset_id_no = ""
+        if "clobTokenIds" in market:
+            clob_token_ids_str = market["clobTokenIds"]
+            clob_token_ids = orjson.loads(clob_token_ids_str)
+            if len(clob_token_ids) > 0:
+                asset_id_yes = clob_token_ids[0]
+            if len(clob_token_ids) > 1:
+                asset_id_no = clob_token_ids[1]
+        asset_ids = market['_asset_ids'] = (asset_id_yes, asset_id_no)
+    asset_id_yes, asset_id_no = asset_ids
 
     # Process YES holders
-    holders_yes = market.get('holders_yes', market.get('holders', []))
-    processed_yes = process_holders(holders_yes, price_yes, asset_id_yes)
+    processed_yes = _process_holders(
+        holders_view(market, 'yes'), price_yes, asset_id_yes,
+        to_remove, flagged_new, flagged_fresh, median_cache, wallet_stats, bypass_filters
+    )
     
     # Process NO holders
-    holders_no = market.get('holders_no', [])
-    processed_no = process_holders(holders_no, price_no, asset_id_no)
+    processed_no = _process_holders(
+        holders_view(market, 'no'), price_no, asset_id_no,
+        to_remove, flagged_new, flagged_fresh, median_cache, wallet_stats, bypass_filters
+    )
+    for side in ('yes', 'no'):
+        market.pop(f'holders_{side}_addrs', None)
+        market.pop(f'holders_{side}_bals', None)
 
     # Store both sets of processed holders
     market['holders_yes'] = processed_yes
     market['holders_no'] = processed_no
-    market['holders'] = processed_yes  # Keep for backward compat
     market['assetID_yes'] = asset_id_yes
     market['assetID_no'] = asset_id_no
-    market['assetID'] = asset_id_yes  # Keep for backward compat
     
     return market
@@ -1,8 +1,15 @@
 import asyncio
 import logging
+import random
 import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from functools import wraps
-from typing import Callable, Any, Coroutine, Optional
+from typing import Callable, Any, Coroutine, Dict, Mapping, Optional, Tuple
+
+import aiohttp
+import orjson
 
 # Настройка базового логгера
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -17,51 +24,209 @@ class RateLimiter:
         self.tokens = rate
         self.last_update = time.monotonic()
         self.lock = asyncio.Lock()
+        self._refill_per_sec = rate / period
+        self._sec_per_token = period / rate
 
     async def acquire(self):
-        async with self.lock:
-            now = time.monotonic()
-            time_passed = now - self.last_update
-            self.tokens += time_passed * (self.rate / self.period)
-            if self.tokens > self.rate:
-                self.tokens = self.rate
-            self.last_update = now
-
-            if self.tokens < 1:
-                wait_time = (1 - self.tokens) * (self.period / self.rate)
-                if wait_time > 0:
-                    await asyncio.sleep(wait_time)
-                self.tokens = 0
-                self.last_update = time.monotonic()
-            else:
-                self.tokens -= 1
+        while True:
+            async with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.last_update) * self._refill_per_sec)
+                self.last_update = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) * self._sec_per_token
+            # Спим без лока: остальные ждущие не выстраиваются в очередь за одним спящим
+            await asyncio.sleep(wait_time)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+class AdmissionController:
+    """
+    Ограничитель конкурентности с изменяемым лимитом (asyncio.Semaphore так не умеет).
+    AIMD: on_rate_limited() уменьшает лимит вдвое (не чаще раза в decrease_interval сек — пачка 429
+    от одного всплеска считается одним сигналом), on_success() после max успехов подряд добавляет 1 слот.
+    """
+    def __init__(self, max_concurrent: int, min_concurrent: int = 1, ceiling: Optional[int] = None,
+                 decrease_interval: float = 1.0):
+        self._max = max_concurrent
+        self._min = min_concurrent
+        self._ceiling = ceiling or max_concurrent
+        self._in_flight = 0
+        self._successes = 0
+        self._decrease_interval = decrease_interval
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition(asyncio.Lock())
+
+    @property
+    def max_concurrent(self) -> int:
+        return self._max
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self._max)
+            self._in_flight += 1
+
+    async def release(self):
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify(1)
+
+    async def set_max(self, n: int):
+        n = max(self._min, min(self._ceiling, n))
+        async with self._cond:
+            raised = n > self._max
+            self._max = n
+            if raised:
+                self._cond.notify_all()
+
+    async def on_rate_limited(self):
+        self._successes = 0
+        now = time.monotonic()
+        if self._max > self._min and now - self._last_decrease >= self._decrease_interval:
+            self._last_decrease = now
+            await self.set_max(self._max // 2)
+            logging.warning(f"429: лимит конкурентности снижен до {self._max}")
+
+    async def on_quota_low(self):
+        """X-RateLimit-Remaining почти исчерпан: -1 слот, с тем же троттлингом, что и on_rate_limited."""
+        self._successes = 0
+        now = time.monotonic()
+        if self._max > self._min and now - self._last_decrease >= self._decrease_interval:
+            self._last_decrease = now
+            await self.set_max(self._max - 1)
+
+    async def on_success(self):
+        self._successes += 1
+        if self._successes >= self._max and self._max < self._ceiling:
+            self._successes = 0
+            await self.set_max(self._max + 1)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+        return False
+
+async def read_json(response: aiohttp.ClientResponse) -> Any:
+    """
+    Декодирует тело ответа через orjson (быстрее, чем response.json() со stdlib json).
+    """
+    body = await response.read()
+    return orjson.loads(body) if body else None
+
+class RateLimitError(aiohttp.ClientResponseError):
+    """
+    429 от сервера. retry_async не засчитывает его в основной бюджет попыток.
+    """
+
+
+def raise_if_rate_limited(response: aiohttp.ClientResponse) -> None:
+    """
+    Поднимает RateLimitError с заголовками ответа: retry читает Retry-After, пул ставит прокси на cool-down.
+    """
+    if response.status == 429:
+        raise RateLimitError(
+            response.request_info,
+            response.history,
+            status=429,
+            message="Rate limit exceeded",
+            headers=response.headers,
+        )
+
+
+def rate_limit_remaining(headers: Optional[Mapping[str, str]]) -> Optional[int]:
+    """
+    Возвращает значение X-RateLimit-Remaining, либо None если заголовка нет.
+    """
+    if not headers:
+        return None
+    try:
+        return int(headers['X-RateLimit-Remaining'])
+    except (KeyError, ValueError):
+        return None
+
+
+def _parse_rate_limit_reset(value: str) -> Optional[float]:
+    # X-RateLimit-Reset бывает и дельтой в секундах, и unix timestamp
+    try:
+        reset = float(value)
+    except ValueError:
+        return None
+    if reset > 1e9:
+        reset -= time.time()
+    return max(0.0, reset)
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    Возвращает задержку из заголовка Retry-After в секундах (число или HTTP-дата),
+    при его отсутствии из X-RateLimit-Reset, либо None.
+    """
+    if not headers:
+        return None
+    value = headers.get('Retry-After')
+    if not value:
+        reset = headers.get('X-RateLimit-Reset')
+        return _parse_rate_limit_reset(reset) if reset else None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
 
 def retry_async(
     retries: Optional[int] = 3,
     delay: float = 1.0,
     backoff: float = 2.0,
     max_delay: float = 16.0,
-    exceptions: tuple = (Exception,)
+    exceptions: tuple = (Exception,),
+    max_rate_limited: int = 10
 ) -> Callable:
     """
     Декоратор для повторного выполнения асинхронной функции при возникновении исключений.
 
+    Задержка считается по схеме "full jitter": случайное значение в [0, min(max_delay, delay * backoff^n)].
+    Если исключение несёт заголовок Retry-After (например, 429), ждём указанное сервером время плюс небольшой jitter.
+
     :param retries: Максимальное количество попыток. Если None, попытки бесконечны.
     :param delay: Начальная задержка между попытками в секундах.
     :param backoff: Множитель для увеличения задержки после каждой попытки.
     :param max_delay: Максимальная задержка между попытками в секундах.
     :param exceptions: Кортеж исключений, при которых следует повторять попытку.
+    :param max_rate_limited: Сколько RateLimitError за вызов не тратят retries; дальше они считаются как обычные ошибки.
     """
     def decorator(func: Callable[..., Coroutine[Any, Any, Any]]) -> Callable[..., Coroutine[Any, Any, Any]]:
         @wraps(func)
         async def wrapper(*args: Any, **kwargs: Any) -> Any:
-            current_delay = delay
             attempt = 0
+            rate_limited = 0
             while True:
                 try:
                     return await func(*args, **kwargs)
                 except exceptions as e:
-                    attempt += 1
+                    if isinstance(e, RateLimitError) and rate_limited < max_rate_limited:
+                        rate_limited += 1
+                        attempt_no = max(attempt, 1)
+                    else:
+                        attempt += 1
+                        attempt_no = attempt
                     if retries is not None and attempt >= retries:
                         error_msg = str(e) if str(e) else repr(e)
                         logging.error(
@@ -69,14 +234,129 @@ def retry_async(
                         )
                         raise  # Повторно вызываем исключение после всех неудачных попыток
 
+                    retry_after = parse_retry_after(getattr(e, 'headers', None))
+                    if retry_after is not None:
+                        sleep_time = retry_after + random.uniform(0, 0.5)
+                    else:
+                        sleep_time = random.uniform(0, min(max_delay, delay * backoff ** (attempt_no - 1)))
+
                     error_msg = str(e) if str(e) else repr(e)
                     status_code = getattr(e, 'status', 'N/A')
                     retry_info = f"{attempt}/{retries}" if retries is not None else f"{attempt}/∞"
                     logging.warning(
                         f"Попытка {retry_info} для '{func.__name__}' не удалась. Код: {status_code}. Ошибка: {error_msg} (тип: {type(e).__name__}). "
-                        f"Повтор через {current_delay:.2f} сек..."
+                        f"Повтор через {sleep_time:.2f} сек..."
                     )
-                    await asyncio.sleep(current_delay)
-                    current_delay = min(current_delay * backoff, max_delay)
+                    await asyncio.sleep(sleep_time)
+        return wrapper
+    return decorator
+
+
+
+# Политики ретраев по классам endpoint'ов: Data API — больше попыток, GraphQL — меньше
+RETRY_DATA = retry_async(retries=5, delay=1.0, backoff=2.0, max_delay=30.0, exceptions=(aiohttp.ClientError, asyncio.TimeoutError))
+RETRY_GQL = retry_async(retries=3, delay=1.0, backoff=2.0, max_delay=30.0, exceptions=(aiohttp.ClientError, asyncio.TimeoutError))
+
+
+class TTLCache:
+    """
+    LRU-словарь с ограничением размера и временем жизни записей.
+    Вытесняет самую давно использованную запись при переполнении; протухшие записи удаляются при чтении.
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, Tuple[Any, float]]" = OrderedDict()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        value, expiry = entry
+        if expiry <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def __contains__(self, key: Any) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __getitem__(self, key: Any) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+_MISSING = object()
+
+
+def singleflight(ttl: float = 60.0, max_entries: int = 10000, ignore: Tuple[str, ...] = ()) -> Callable:
+    """
+    Декоратор: одновременные вызовы с одинаковыми аргументами ждут один и тот же запрос,
+    а успешный результат переиспользуется ещё ttl секунд. Исключения не кешируются.
+
+    Первый позиционный аргумент (сессия/пул) и именованные аргументы из ignore в ключ не входят.
+    Ставить снаружи retry_async, чтобы ретраи тоже были общими.
+    """
+    def decorator(func: Callable[..., Coroutine[Any, Any, Any]]) -> Callable[..., Coroutine[Any, Any, Any]]:
+        # key -> (task, expiry); expiry = inf пока задача выполняется.
+        # Порядок — по времени завершения, как LRU в TTLCache: в начале самые старые.
+        entries: "OrderedDict[Any, Tuple[asyncio.Task, float]]" = OrderedDict()
+
+        def make_room(now: float) -> bool:
+            for key in [k for k, (_, expiry) in entries.items() if expiry <= now]:
+                del entries[key]
+            # Выполняющиеся задачи не вытесняем: на них могут ждать другие вызовы
+            for key in [k for k, (task, _) in entries.items() if task.done()]:
+                if len(entries) < max_entries:
+                    break
+                del entries[key]
+            return len(entries) < max_entries
+
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            key = (args[1:], tuple(sorted(kv for kv in kwargs.items() if kv[0] not in ignore)))
+            now = time.monotonic()
+            loop = asyncio.get_running_loop()
+
+            entry = entries.get(key)
+            if entry is not None:
+                task, expiry = entry
+                if now < expiry and task.get_loop() is loop:
+                    # shield: отмена одного ожидающего не отменяет запрос для остальных
+                    return await asyncio.shield(task)
+
+            if len(entries) >= max_entries and not make_room(now):
+                # Все слоты заняты выполняющимися запросами — идём без кеша
+                return await func(*args, **kwargs)
+
+            task = loop.create_task(func(*args, **kwargs))
+            entries[key] = (task, float('inf'))
+
+            def on_done(t: asyncio.Task) -> None:
+                if entries.get(key, (None,))[0] is not t:
+                    return
+                if t.cancelled() or t.exception() is not None:
+                    del entries[key]
+                else:
+                    entries[key] = (t, time.monotonic() + ttl)
+                    entries.move_to_end(key)
+
+            task.add_done_callback(on_done)
+            return await asyncio.shield(task)
         return wrapper
     return decorator
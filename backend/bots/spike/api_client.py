@@ -1,42 +1,45 @@
 """API Client for Spike Detector"""
 import aiohttp
-import json
+import orjson
 import asyncio
 import logging
 import itertools
-import random
-from aiohttp_socks import ProxyConnector
 from .config import API_URLS, USER_AGENTS, PROXIES
+from backend.services.http_sessions import build_sessions
 
 # Cycle through user agents for each request
 user_agent_cycle = itertools.cycle(USER_AGENTS)
+# Built once: fetch_with_retry runs for every page of every refetch
+_REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=15)
+_HEADERS_BASE = {'Accept-Encoding': 'gzip, deflate, br'}
+# Round-robin over the session pool (next() on itertools.count is atomic under the GIL)
+session_counter = itertools.count()
 
 
 import traceback
 
 async def fetch_with_retry(sessions, url, max_retries=6):
     """
-    Fetches URL using a random session from the pool.
+    Fetches URL using the next open session from the pool, round-robin.
     """
     for attempt in range(max_retries):
-        # Pick a random session from the pool
-        if not sessions:
+        # Pick the next open session from the pool
+        for _ in range(len(sessions)):
+            session = sessions[next(session_counter) % len(sessions)]
+            if not session.closed:
+                break
+        else:
             logging.error("No sessions available")
             return None
-            
-        session = random.choice(sessions)
         
-        headers = {
-            'User-Agent': next(user_agent_cycle),
-            'Accept-Encoding': 'gzip, deflate, br'
-        }
+        headers = {**_HEADERS_BASE, 'User-Agent': next(user_agent_cycle)}
         
         try:
             # Reduced timeout to 15s (was 30s) to fail faster on bad proxies
             # Proxy is already bound to the session, so we don't pass it here
-            async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=15), ssl=False) as response:
+            async with session.get(url, headers=headers, timeout=_REQUEST_TIMEOUT, ssl=False) as response:
                 response.raise_for_status()
-                return await response.json()
+                return await response.json(loads=orjson.loads)
         except Exception as e:
             # Reduced backoff: 1s, 2s, 4s...
             wait_time = min(10, 1 * (2 ** attempt))
@@ -77,9 +80,9 @@ async def fetch_page_worker(sessions, offset_iterator, markets_list, stop_event,
             for market in event.get('markets', []):
                 try:
                     # Parse JSON strings in fields
-                    outcomes = json.loads(market.get('outcomes', '[]'))
-                    outcome_prices = json.loads(market.get('outcomePrices', '[]'))
-                    clob_token_ids = json.loads(market.get('clobTokenIds', '[]'))
+                    outcomes = orjson.loads(market.get('outcomes', '[]'))
+                    outcome_prices = orjson.loads(market.get('outcomePrices', '[]'))
+                    clob_token_ids = orjson.loads(market.get('clobTokenIds', '[]'))
 
                     market_dict = {
                         'id': market.get('id'),
@@ -108,32 +111,7 @@ async def fetch_all_markets():
     stop_event = asyncio.Event()
     
     # Create session pool
-    sessions = []
-    
-    # Ensure we have enough user agents
-    agents_to_use = []
-    while len(agents_to_use) < len(PROXIES):
-        agents_to_use.extend(USER_AGENTS)
-    agents_to_use = agents_to_use[:len(PROXIES)]
-
-    for proxy_url, ua in zip(PROXIES, agents_to_use):
-        connector = None
-        if proxy_url:
-            if proxy_url.startswith('socks'):
-                connector = ProxyConnector.from_url(proxy_url, limit=10, ssl=False, rdns=False)
-            elif proxy_url.startswith('http'):
-                connector = ProxyConnector.from_url(proxy_url, limit=10, ssl=False, rdns=False)
-            else:
-                connector = aiohttp.TCPConnector(limit=10, ssl=False)
-        else:
-            connector = aiohttp.TCPConnector(limit=10, ssl=False)
-
-        session = aiohttp.ClientSession(connector=connector)
-        sessions.append(session)
-    
-    if not sessions:
-        # Fallback if no proxies
-        sessions.append(aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)))
+    sessions = build_sessions(PROXIES, USER_AGENTS)
 
     try:
         tasks = []
@@ -1,5 +1,5 @@
-import queue
 import random
+import re
 import threading
 import time
 import sys
@@ -7,23 +7,26 @@ import logging
 import asyncio
 from .api_client import fetch_all_markets
 from .config import CHUNK_SIZE, MIN_PRICE, LOG_LEVEL, LOG_FILE, PROXIES, REFETCH_INTERVAL
-from .processors import EventProcessor
+from .processors import EventChannel, EventProcessor
 from .websocket_worker import WebSocketWorker
 
+# Words to exclude from market titles
+EXCLUDED_WORDS = ["Up or Down", "Ethereum", "Bitcoin", "Solana", "BTC", "ETH", "XRP", "SOL", "vs.", "LoL", "Spread", "Total"]
+# One regex pass per title instead of a substring scan per word
+EXCLUDED_RE = re.compile("|".join(map(re.escape, EXCLUDED_WORDS)))
+
 def filter_markets(markets):
     filtered = []
-    # Words to exclude from market titles
-    excluded_words = ["Up or Down", "Ethereum", "Bitcoin", "Solana", "BTC", "ETH", "XRP", "SOL", "vs.", "LoL", "Spread", "Total"]
 
     for market in markets:
         prices = market.get('prices', [])
-        question = market.get('question', '')
 
-        # Check if exactly 2 outcomes and both prices < 0.95
-        # Also exclude markets containing excluded words in the title
-        exclude_market = any(word in question for word in excluded_words)
+        # Check if exactly 2 outcomes and both prices < 0.95 (cheap, rejects most markets)
+        if len(prices) != 2 or prices[0] >= MIN_PRICE or prices[1] >= MIN_PRICE:
+            continue
 
-        if (len(prices) == 2 and max(prices) < MIN_PRICE and not exclude_market):
+        # Only then exclude markets containing excluded words in the title
+        if EXCLUDED_RE.search(market.get('question', '')) is None:
             filtered.append(market)
 
     logging.info(f"Filtered to {len(filtered)} markets (both prices < {MIN_PRICE}, excluding crypto/directional markets)")
@@ -33,16 +36,17 @@ def build_asset_to_market_map(filtered_markets):
     asset_map = {}
     
     for market in filtered_markets:
+        # Market fields are shared by all of its outcomes; only outcome_index differs
+        shared = {
+            'market_id': market['conditionId'],
+            'question': market['question'],
+            'slug': market['slug'],
+            'event_slug': market['event_slug'],  # Add event slug
+            'outcomes': market['outcomes'],
+            'prices': market['prices'],
+        }
         for i, asset_id in enumerate(market['asset_ids']):
-            asset_map[asset_id] = {
-                'market_id': market['conditionId'],
-                'question': market['question'],
-                'slug': market['slug'],
-                'event_slug': market['event_slug'],  # Add event slug
-                'outcomes': market['outcomes'],
-                'prices': market['prices'],
-                'outcome_index': i
-            }
+            asset_map[asset_id] = {**shared, 'outcome_index': i}
     
     return asset_map
 
@@ -53,23 +57,20 @@ def split_chunks(asset_ids, chunk_size=CHUNK_SIZE):
         chunks.append(asset_ids[i:i + chunk_size])
     return chunks
 
-def setup_infrastructure(filtered_markets):
-    # Extract unique asset IDs
-    asset_ids = []
-    for market in filtered_markets:
-        asset_ids.extend(market['asset_ids'])
-    asset_ids = list(set(asset_ids))  # Deduplicate
+def setup_infrastructure(filtered_markets, loop):
+    # Extract unique asset IDs in one pass (returned as a set for refetch bookkeeping)
+    asset_ids_set = {asset_id for market in filtered_markets for asset_id in market['asset_ids']}
     
-    logging.info(f"Total unique asset IDs: {len(asset_ids)}")
+    logging.info(f"Total unique asset IDs: {len(asset_ids_set)}")
     
     # Split into chunks
-    chunks = split_chunks(asset_ids)
+    chunks = split_chunks(list(asset_ids_set))
     logging.info(f"Split into {len(chunks)} chunks (max {CHUNK_SIZE} per chunk)")
     
-    # Create thread-safe queue
-    event_queue = queue.Queue(maxsize=10000)
+    # Thread-safe handoff from WebSocket threads to the processor task
+    event_queue = EventChannel(loop, maxlen=10000)
     
-    return chunks, event_queue, asset_ids
+    return chunks, event_queue, asset_ids_set
 
 
 class PerformanceMonitor:
@@ -119,10 +120,9 @@ class SpikeBot:
             self.logger.info(f"Found {len(new_markets)} new markets")
 
             # Extract new asset_ids
-            new_asset_ids = []
-            for market in new_markets:
-                new_asset_ids.extend(market['asset_ids'])
-            new_asset_ids = list(set(new_asset_ids) - self.current_asset_ids)
+            new_asset_ids = list(
+                {asset_id for market in new_markets for asset_id in market['asset_ids']} - self.current_asset_ids
+            )
 
             if not new_asset_ids:
                 self.logger.info("No new asset_ids to subscribe")
@@ -137,7 +137,8 @@ class SpikeBot:
             # Update processor's asset_map
             new_asset_map = build_asset_to_market_map(new_markets)
             if self.processor:
-                self.processor.asset_map.update(new_asset_map)
+                # Swap in a merged snapshot with one rebind; the processor never sees a half-updated map
+                self.processor.asset_map = {**self.processor.asset_map, **new_asset_map}
 
             # Subscribe new asset_ids to WebSocket workers
             self.subscribe_new_assets(new_asset_ids)
@@ -161,31 +162,17 @@ class SpikeBot:
                 available_capacity = CHUNK_SIZE - current_count
                 available_workers.append((worker, available_capacity))
 
-        # Sort by available capacity (most available first)
+        # Most available capacity first; each worker takes one contiguous slice
         available_workers.sort(key=lambda x: x[1], reverse=True)
 
-        # Group assets by worker based on capacity
-        worker_assets = {worker: [] for worker, _ in available_workers}
-        unassigned_assets = []
-
-        # Distribute assets to workers
-        current_worker_idx = 0
-        for asset_id in new_asset_ids:
-            if current_worker_idx >= len(available_workers):
-                unassigned_assets.append(asset_id)
-                continue
-
-            worker, capacity = available_workers[current_worker_idx]
-            worker_assets[worker].append(asset_id)
-
-            # Check if this worker is now full
-            if len(worker_assets[worker]) >= capacity:
-                current_worker_idx += 1
-
         # Send batched subscriptions to each worker
-        for worker, assets in worker_assets.items():
-            if assets:
-                worker.subscribe_additional_assets(assets)
+        assigned = 0
+        for worker, capacity in available_workers:
+            if assigned >= len(new_asset_ids):
+                break
+            worker.subscribe_additional_assets(new_asset_ids[assigned:assigned + capacity])
+            assigned += capacity
+        unassigned_assets = new_asset_ids[assigned:]
 
         # Create new workers for unassigned assets
         if unassigned_assets:
@@ -218,8 +205,8 @@ class SpikeBot:
         self.last_refetch_time = time.time()
 
         # Step 3: Setup infrastructure
-        chunks, event_queue, asset_ids = setup_infrastructure(filtered)
-        self.current_asset_ids = set(asset_ids)  # Store for refetching
+        loop = asyncio.get_running_loop()
+        chunks, event_queue, self.current_asset_ids = setup_infrastructure(filtered, loop)  # Store for refetching
         asset_map = build_asset_to_market_map(filtered)
 
         # Step 4: Start event processor
@@ -244,6 +231,7 @@ class SpikeBot:
         self.logger.info("✅ Spike Bot running.")
 
         # Status monitoring loop
+        last_dropped = 0
         while self.running:
             await asyncio.sleep(30)
 
@@ -252,8 +240,14 @@ class SpikeBot:
             if current_time - self.last_refetch_time >= REFETCH_INTERVAL:
                 await self.refetch_and_update()
 
+            dropped = event_queue.dropped
             self.logger.info(f"[Status] Queue size: {event_queue.qsize()}, "
+                             f"Dropped events: {dropped}, "
                              f"Active markets: {len(self.processor.asset_counters)}")
+            if dropped > last_dropped:
+                self.logger.warning(f"Event queue overflowed: {dropped - last_dropped} oldest events dropped "
+                                    f"since last status (processor can't keep up)")
+            last_dropped = dropped
             self.monitor.log_stats()
             
         # Cancel processor task on exit
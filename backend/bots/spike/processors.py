@@ -1,10 +1,118 @@
 import time
 import logging
-import queue
 import asyncio
-from collections import deque, defaultdict
+import threading
+from collections import deque
 from .config import MIN_BUY_USD, SPIKE_THRESHOLD, TIME_WINDOW, MAX_SIGNAL_PRICE
 
+# Re-sum the window every N appends to shed floating point drift of the running total
+SUM_RESYNC_INTERVAL = 10_000
+# Max events pulled from the WS channel per event loop tick
+QUEUE_DRAIN_BATCH = 256
+
+
+class EventChannel:
+    """WS threads -> event loop handoff: deque append/popleft are atomic, the consumer
+    is only woken via call_soon_threadsafe when it is actually waiting"""
+
+    def __init__(self, loop, maxlen=10000):
+        self.events = deque(maxlen=maxlen)  # when full the oldest events are dropped (and counted)
+        self.maxlen = maxlen
+        self.dropped = 0
+        self._drop_lock = threading.Lock()  # only taken on the overflow path
+        self.loop = loop
+        self._ready = asyncio.Event()
+        self._waiting = False
+
+    def put(self, event):
+        """Called from worker threads"""
+        if len(self.events) >= self.maxlen:
+            with self._drop_lock:
+                self.dropped += 1
+        self.events.append(event)
+        if self._waiting:
+            self._waiting = False
+            self.loop.call_soon_threadsafe(self._ready.set)
+
+    async def wait(self):
+        """Called from the loop; returns once at least one event is queued"""
+        if self.events:
+            return
+        self._waiting = True
+        # Re-check after publishing the flag so an append racing with it is not missed
+        if not self.events:
+            await self._ready.wait()
+        self._waiting = False
+        self._ready.clear()
+
+    def qsize(self):
+        return len(self.events)
+
+
+class TradeWindow:
+    """Sliding window of BUY trades for one asset: parallel lists (SoA) with a head index.
+    Windows are small, so plain lists with lazy compaction beat deque node allocation"""
+    __slots__ = ('ts', 'usd', 'head', 'sum_usd', 'appends', 'count', 'last_price', 'last_alert_count')
+
+    def __init__(self):
+        self.ts = []
+        self.usd = []
+        self.head = 0  # index of the oldest live trade; [0:head] is evicted
+        self.sum_usd = 0.0  # running sum of usd: add on append, subtract on evict
+        self.appends = 0
+        self.count = 0
+        self.last_price = 0.0
+        self.last_alert_count = 0
+
+    def add(self, timestamp, usd_value, price, now):
+        """Append + prune + threshold check in one pass; returns True when a spike alert is due"""
+        self.ts.append(timestamp)
+        self.usd.append(usd_value)
+        self.sum_usd += usd_value
+        self.appends += 1
+        if self.appends % SUM_RESYNC_INTERVAL == 0:
+            self.sum_usd = sum(self.usd[self.head:])
+        self.last_price = price
+
+        self.prune(now)
+
+        # Alert only at multiples of threshold
+        count = self.count
+        return count >= SPIKE_THRESHOLD and count > self.last_alert_count and count % SPIKE_THRESHOLD == 0
+
+    def prune(self, now):
+        """Remove trades older than TIME_WINDOW seconds"""
+        ts = self.ts
+        usd = self.usd
+        head = self.head
+        end = len(ts)
+        cutoff = now - TIME_WINDOW
+
+        while head < end and ts[head] < cutoff:
+            self.sum_usd -= usd[head]
+            head += 1
+
+        if head == end:
+            # Window emptied: drop everything and reset the running sum exactly
+            ts.clear()
+            usd.clear()
+            head = 0
+            self.sum_usd = 0.0
+        elif head >= 64 and head * 2 >= end:
+            # Compact once the evicted prefix dominates the lists
+            del ts[:head]
+            del usd[:head]
+            head = 0
+        self.head = head
+
+        old_count = self.count
+        self.count = len(ts) - head
+
+        # Reset alert counter if count dropped below threshold
+        if old_count >= SPIKE_THRESHOLD and self.count < SPIKE_THRESHOLD:
+            self.last_alert_count = 0
+
+
 class EventProcessor:
     def __init__(self, event_queue, asset_to_market_map, monitor, signal_store, ws_manager):
         self.queue = event_queue
@@ -12,97 +120,37 @@ class EventProcessor:
         self.monitor = monitor
         self.signal_store = signal_store
         self.ws_manager = ws_manager
-        self.asset_counters = defaultdict(lambda: {
-            'recent_trades': deque(),
-            'count': 0,
-            'last_activity': time.time(),
-            'last_alert_count': 0
-        })
+        self._broadcasts = set()  # strong refs so pending broadcast tasks aren't GC'd
+        self.asset_counters = {}  # asset_id -> TradeWindow, created on first BUY
         self.running = True
         
-    def parse_event(self, event):
-        """Extract trade details from event"""
-        try:
-            asset_id = event.get('asset_id')
-            if not asset_id:
-                return None
-                
-            size = event.get('size', 0)
-            if not isinstance(size, (int, float)) or size <= 0:
-                return None
-            size = float(size)
-            
-            price = event.get('price', 0)
-            if not isinstance(price, (int, float)) or price <= 0:
-                return None
-            price = float(price)
-            
-            side = event.get('side', '')
-            if not side:
-                return None
-                
-            timestamp = event.get('_timestamp', time.time())
-            
-            return {
-                'asset_id': asset_id,
-                'size': size,
-                'price': price,
-                'side': side,
-                'usd_value': size * price,
-                'timestamp': timestamp
-            }
-        except Exception as e:
-            logging.error(f"Parse error: {e}")
-            return None
-            
-    def prune_old_trades(self, asset_id, current_time):
-        """Remove trades older than TIME_WINDOW seconds"""
-        counter = self.asset_counters[asset_id]
-        trades = counter['recent_trades']
-
-        while trades and (current_time - trades[0]['timestamp']) > TIME_WINDOW:
-            trades.popleft()
-
-        old_count = counter['count']
-        counter['count'] = len(trades)
-
-        # Reset alert counter if count dropped below threshold
-        if old_count >= SPIKE_THRESHOLD and counter['count'] < SPIKE_THRESHOLD:
-            counter['last_alert_count'] = 0
-
-    def handle_spike(self, asset_id, trade):
-        """Process BUY trade and check for spike per outcome"""
-        if trade['side'] != 'BUY' or trade['usd_value'] < MIN_BUY_USD:
+    def handle_spike(self, asset_id, event, market_info, now):
+        """Process BUY trade and check for spike per outcome.
+        event is already validated by WebSocketWorker (float size/price > 0, monotonic _timestamp set);
+        now is the time.monotonic() of the current batch"""
+        if event['side'] != 'BUY':
             return
-            
-        market_info = self.asset_map.get(asset_id)
-        if not market_info:
-            logging.warning(f"Missing market info for asset_id: {asset_id}")
+        price = event['price']
+        usd_value = event['size'] * price
+        if usd_value < MIN_BUY_USD:
             return
-            
-        current_time = time.time()
-        counter = self.asset_counters[asset_id]
-        
-        # Add trade
-        counter['recent_trades'].append(trade)
-        counter['last_activity'] = current_time
-        
-        # Prune old trades
-        self.prune_old_trades(asset_id, current_time)
 
-        # Check for spike - alert only at multiples of threshold
-        if (counter['count'] >= SPIKE_THRESHOLD and
-            counter['count'] > counter['last_alert_count'] and
-            counter['count'] % SPIKE_THRESHOLD == 0):
+        counters = self.asset_counters
+        counter = counters.get(asset_id)
+        if counter is None:
+            counter = counters[asset_id] = TradeWindow()
+
+        # Add trade, prune the window and check for spike
+        if counter.add(event['_timestamp'], usd_value, price, now):
             self.trigger_alert(asset_id, market_info, counter)
-            counter['last_alert_count'] = counter['count']
+            counter.last_alert_count = counter.count
             
     def trigger_alert(self, asset_id, market_info, counter):
         """Log spike alert per outcome and send to SignalStore/WebSocket"""
-        total_usd = sum(t['usd_value'] for t in counter['recent_trades'])
+        total_usd = counter.sum_usd
         outcome_index = market_info['outcome_index']
         outcome = market_info['outcomes'][outcome_index]
-        price = counter['recent_trades'][-1]['price']  # Use price from the last trade that triggered the spike
+        price = counter.last_price  # Use price from the last trade that triggered the spike
 
         if price > MAX_SIGNAL_PRICE:
             logging.info(f"Skipping spike alert for {market_info['question']} - {outcome}: Price {price} > {MAX_SIGNAL_PRICE}")
@@ -116,12 +164,12 @@ class EventProcessor:
             "timestamp": time.time(),
             "asset_id": asset_id,
             "event_slug": market_info.get('event_slug', ''),
-            "count": counter['count'],
+            "count": counter.count,
             "amount_usd": total_usd,
             "type": "spike"
         }
 
-        logging.info(f"🚨 SPIKE ALERT! {market_info['question']} - {outcome} ({counter['count']} buys, ${total_usd:,.0f})")
+        logging.info(f"🚨 SPIKE ALERT! {market_info['question']} - {outcome} ({counter.count} buys, ${total_usd:,.0f})")
 
         # Save to DB
         if self.signal_store:
@@ -129,60 +177,36 @@ class EventProcessor:
 
         # Broadcast via WebSocket
         if self.ws_manager:
-            # We need to run async broadcast in this sync method or thread
-            # Since this runs in a thread, we can't await directly if ws_manager.broadcast is async
-            # But ws_manager.broadcast IS async.
-            # We should probably use a helper or fire and forget.
-            # Or better, EventProcessor.run should be async?
-            # Currently EventProcessor.run is a while loop with queue.get.
-            # I can make run() async or use asyncio.run_coroutine_threadsafe.
-            
-            # Assuming ws_manager.broadcast is async
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                     loop.create_task(self.ws_manager.broadcast(spike_data))
-                else:
-                     asyncio.run(self.ws_manager.broadcast(spike_data))
-            except RuntimeError:
-                # If no loop in this thread (it's a separate thread), we need to find the main loop
-                # But SpikeDetector runs in asyncio.run(), so main thread has loop.
-                # EventProcessor runs in a separate thread `processor_thread`.
-                # So it doesn't have an event loop.
-                # I should probably change EventProcessor to run in the main asyncio loop as a task, not a thread.
-                # That would be better.
-                pass
-
-    def run(self):
-        """Main processing loop"""
-        # If we want to support async broadcast, we should probably run this as an async task
-        # But for now, let's keep it sync and maybe just print or fix later.
-        # Actually, I will change run() to be async and run it as a task in main.py
-        pass 
-        # Wait, I am replacing the file content. I should provide the full content.
-        # I will implement run() as async here.
-        
+            # run_async is a task on the main loop, so the broadcast is scheduled directly
+            task = asyncio.create_task(self.ws_manager.broadcast(spike_data))
+            self._broadcasts.add(task)
+            task.add_done_callback(self._broadcasts.discard)
+
     async def run_async(self):
         """Main processing loop (async)"""
+        events = self.queue.events
+        popleft = events.popleft
         while self.running:
-            try:
-                # Non-blocking get from queue? Queue is thread-safe but not asyncio-aware.
-                # We can use run_in_executor to get from queue or just check with sleep.
+            await self.queue.wait()
+
+            # asset_map may be swapped by a refetch; bind one snapshot per batch
+            asset_map_get = self.asset_map.get
+            handle_spike = self.handle_spike
+            processed = 0
+            now = time.monotonic()  # one clock read per batch for pruning
+
+            # Drain a batch per tick, then yield to other tasks
+            for _ in range(min(len(events), QUEUE_DRAIN_BATCH)):
+                event = popleft()
                 try:
-                    event = self.queue.get_nowait()
-                except queue.Empty:
-                    await asyncio.sleep(0.1)
-                    continue
-                
-                trade = self.parse_event(event)
-                
-                if trade and trade['asset_id'] in self.asset_map:
-                    self.handle_spike(trade['asset_id'], trade)
-                    self.monitor.events_processed += 1
-                    
-            except Exception as e:
-                logging.error(f"Processor error: {e}")
-                await asyncio.sleep(0.1)
-
-    # For backward compatibility if needed, but I'll change main.py to call run_async
+                    asset_id = event['asset_id']
+                    market_info = asset_map_get(asset_id)
+                    if market_info:
+                        handle_spike(asset_id, event, market_info, now)
+                        processed += 1
+
+                except Exception as e:
+                    logging.error(f"Processor error: {e}")
 
+            self.monitor.events_processed += processed
+            await asyncio.sleep(0)
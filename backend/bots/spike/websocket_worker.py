@@ -1,46 +1,70 @@
 """WebSocket воркеры"""
 import websocket
-import json
+import orjson
 import time
 import logging
 import ssl
 import itertools
+import random
+import threading
 import requests
-from urllib.parse import urlparse
-from .config import WS_URL, WS_PING_INTERVAL, WS_PING_TIMEOUT, USER_AGENTS, PROXIES
+from requests.adapters import HTTPAdapter
+from .config import WS_URL, WS_PING_INTERVAL, WS_PING_TIMEOUT, USER_AGENTS, WS_PROXIES
 
 # Cycle through user agents for WebSocket connections
 ws_user_agent_cycle = itertools.cycle(USER_AGENTS)
 
 # Cycle through proxies for WebSocket connections
-ws_proxy_cycle = itertools.cycle(PROXIES) if PROXIES else None
+ws_proxy_cycle = itertools.cycle(WS_PROXIES) if WS_PROXIES else None
 
+# Reconnect backoff: base * 2^attempt capped at max, +/-25% jitter so workers don't reconnect in lockstep
+RECONNECT_BASE_DELAY = 5
+RECONNECT_MAX_DELAY = 60
+# Backoff resets only after a connection stayed up this long
+STABLE_CONNECTION_SECS = 60
 
-def test_proxy(proxy_url, timeout=5):
-    """Test if proxy is working by making a quick HTTP request"""
+# Proxy test results shared by all workers: proxy url -> (ok, expiry)
+PROXY_TEST_TTL = 300
+_proxy_cache = {}
+_proxy_cache_lock = threading.Lock()
+
+# One keep-alive session for proxy checks instead of a new connection per requests.get
+_proxy_test_session = requests.Session()
+_proxy_test_session.mount('http://', HTTPAdapter(pool_connections=64, pool_maxsize=64, max_retries=0))
+
+
+def test_proxy(proxy, timeout=5):
+    """Test if a ParsedProxy is working; results are cached for PROXY_TEST_TTL seconds"""
+    now = time.time()
+    with _proxy_cache_lock:
+        cached = _proxy_cache.get(proxy.url)
+    if cached and now < cached[1]:
+        return cached[0]
+
+    ok = _check_proxy(proxy, timeout)
+    with _proxy_cache_lock:
+        _proxy_cache[proxy.url] = (ok, time.time() + PROXY_TEST_TTL)
+    return ok
+
+
+def _check_proxy(proxy, timeout):
+    """Quick HTTP request through the proxy"""
     try:
-        parsed = urlparse(proxy_url)
-        proxy_host = parsed.hostname
-        proxy_port = parsed.port
-        proxy_auth = parsed.netloc.split('@')[0]
-        proxy_user, proxy_pass = proxy_auth.split(':', 1)
-
-        proxies = {
-            'http': f'http://{proxy_user}:{proxy_pass}@{proxy_host}:{proxy_port}',
-            'https': f'http://{proxy_user}:{proxy_pass}@{proxy_host}:{proxy_port}'
-        }
+        proxy_http = f'http://{proxy.user}:{proxy.password}@{proxy.host}:{proxy.port}'
+        proxies = {'http': proxy_http, 'https': proxy_http}
 
         # Test with a simple HTTP request to httpbin.org
-        response = requests.get('http://httpbin.org/ip', proxies=proxies, timeout=timeout)
+        response = _proxy_test_session.get('http://httpbin.org/ip', proxies=proxies, timeout=timeout)
         return response.status_code == 200
     except Exception as e:
-        logging.warning(f"Proxy test failed for {proxy_url}: {e}")
+        logging.warning(f"Proxy test failed for {proxy.url}: {e}")
         return False
 
 
 class WebSocketWorker:
     def __init__(self, chunk, event_queue, worker_id, use_proxy=True):
-        self.chunk = chunk
+        self.chunk = chunk  # list keeps subscription order for on_open
+        self.chunk_set = set(chunk)
         self.queue = event_queue
         self.worker_id = worker_id
         self.use_proxy = use_proxy
@@ -55,17 +79,17 @@ class WebSocketWorker:
             "assets_ids": self.chunk,
             "type": "market"
         }
-        ws.send(json.dumps(subscribe_msg))
-        self.reconnect_attempts = 0
+        ws.send(orjson.dumps(subscribe_msg).decode())
         logging.info(f"Worker {self.worker_id}: Connected and subscribed to {len(self.chunk)} assets")
         
     def on_message(self, ws, message):
-        # Ignore non-JSON messages (PONG frames, empty messages, etc.)
-        if not message.strip() or not (message.startswith('{') or message.startswith('[')):
+        # Most frames are book/price updates: reject them with a substring scan before parsing.
+        # This also drops non-JSON messages (PONG frames, empty messages, etc.)
+        if '"last_trade_price"' not in message or not message.startswith('{'):
             return
 
         try:
-            data = json.loads(message)
+            data = orjson.loads(message)
 
             # Validate required fields and positive values
             if 'asset_id' not in data or 'size' not in data or 'price' not in data or 'side' not in data:
@@ -89,7 +113,7 @@ class WebSocketWorker:
             logging.debug(f"Worker {self.worker_id} received message: {data}")  # Debug log
             if data.get('event_type') == 'last_trade_price':
                 data['_worker_id'] = self.worker_id
-                data['_timestamp'] = time.time()
+                data['_timestamp'] = time.monotonic()  # window clock, immune to wall-clock jumps
                 self.queue.put(data)
             else:
                 logging.debug(f"Worker {self.worker_id} ignored message without 'last_trade_price' event_type: {list(data.keys())}")  # Debug ignored
@@ -109,8 +133,15 @@ class WebSocketWorker:
         if not self.ws or not new_asset_ids:
             return
 
+        # Only send assets this worker is not subscribed to yet
+        chunk_set = self.chunk_set
+        new_asset_ids = [a for a in dict.fromkeys(new_asset_ids) if a not in chunk_set]
+        if not new_asset_ids:
+            return
+
         try:
             # Add new assets to our chunk
+            chunk_set.update(new_asset_ids)
             self.chunk.extend(new_asset_ids)
 
             # Send subscription message for new assets
@@ -118,13 +149,15 @@ class WebSocketWorker:
                 "assets_ids": new_asset_ids,
                 "type": "market"
             }
-            self.ws.send(json.dumps(subscribe_msg))
+            self.ws.send(orjson.dumps(subscribe_msg).decode())
             logging.info(f"Worker {self.worker_id}: Subscribed to {len(new_asset_ids)} additional assets")
         except Exception as e:
             logging.error(f"Worker {self.worker_id}: Failed to subscribe additional assets: {e}")
         
     def run(self):
         while self.running:
+            # Сбрасываем до всего, что может бросить: иначе except прочтёт время прошлого соединения
+            self.connection_start_time = None
             try:
                 headers = {'User-Agent': next(ws_user_agent_cycle)}
                 self.ws = websocket.WebSocketApp(
@@ -145,31 +178,44 @@ class WebSocketWorker:
                 # Add proxy settings if proxies are available and use_proxy is enabled
                 use_actual_proxy = False
                 if self.use_proxy and ws_proxy_cycle:
-                    proxy_url = next(ws_proxy_cycle)
-                    if test_proxy(proxy_url):
-                        parsed = urlparse(proxy_url)
-                        proxy_host = parsed.hostname
-                        proxy_port = parsed.port
-                        proxy_auth = parsed.netloc.split('@')[0]  # user:pass
-                        proxy_user, proxy_pass = proxy_auth.split(':', 1)
-
+                    proxy = next(ws_proxy_cycle)
+                    if test_proxy(proxy):
                         run_forever_kwargs.update({
                             "proxy_type": "http",
-                            "http_proxy_host": proxy_host,
-                            "http_proxy_port": proxy_port,
-                            "http_proxy_auth": (proxy_user, proxy_pass)
+                            "http_proxy_host": proxy.host,
+                            "http_proxy_port": proxy.port,
+                            "http_proxy_auth": (proxy.user, proxy.password)
                         })
                         use_actual_proxy = True
-                        logging.debug(f"Worker {self.worker_id} using proxy {proxy_url}")
+                        logging.debug(f"Worker {self.worker_id} using proxy {proxy.url}")
                     else:
-                        logging.warning(f"Worker {self.worker_id} proxy {proxy_url} failed test, connecting without proxy")
+                        logging.warning(f"Worker {self.worker_id} proxy {proxy.url} failed test, connecting without proxy")
 
                 if not use_actual_proxy:
                     logging.debug(f"Worker {self.worker_id} connecting without proxy")
 
-                self.ws.run_forever(**run_forever_kwargs)
+                # run_forever reports connection errors via on_error and returns instead of raising
+                has_errored = self.ws.run_forever(**run_forever_kwargs)
+                stable = self._reset_backoff_if_stable()
+                if has_errored or not stable:
+                    self._backoff("connection errored" if has_errored else "connection dropped early")
             except Exception as e:
-                self.reconnect_attempts += 1
-                sleep_time = 5 * (2 ** min(self.reconnect_attempts, 5))
-                logging.warning(f"Worker {self.worker_id} reconnecting in {sleep_time}s (attempt {self.reconnect_attempts}): {e}")
-                time.sleep(sleep_time)
+                self._reset_backoff_if_stable()
+                self._backoff(e)
+
+    def _reset_backoff_if_stable(self):
+        """A server that drops right after accept must not reset the backoff; returns True if stable"""
+        if self.connection_start_time and time.time() - self.connection_start_time >= STABLE_CONNECTION_SECS:
+            self.reconnect_attempts = 0
+            return True
+        return False
+
+    def _backoff(self, reason):
+        """Sleeps the capped, jittered reconnect delay"""
+        if not self.running:
+            return
+        self.reconnect_attempts += 1
+        sleep_time = min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * (2 ** min(self.reconnect_attempts, 4)))
+        sleep_time *= 0.75 + 0.5 * random.random()
+        logging.warning(f"Worker {self.worker_id} reconnecting in {sleep_time:.1f}s (attempt {self.reconnect_attempts}): {reason}")
+        time.sleep(sleep_time)
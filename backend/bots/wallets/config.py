@@ -69,3 +69,4 @@ SOURCING_CRITERIA_BASE = {
 # Monitoring Parameters
 MONITORING_URL = "https://data-api.polymarket.com/activity"
 MONITORING_CYCLE_DELAY = 40  # seconds (adjusted for load)
+MARKET_DETAILS_CACHE_TTL = MONITORING_CYCLE_DELAY * 3  # seconds; Gamma market details reuse
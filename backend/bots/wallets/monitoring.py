@@ -1,21 +1,34 @@
 import asyncio
 import aiohttp
+import hashlib
+import heapq
+import itertools
 import time
 import random
 import logging
-import json
+import orjson
 from datetime import datetime, timedelta
-from aiohttp_socks import ProxyConnector
 from .config import (
     MONITORING_URL, PROXIES, USER_AGENTS,
     ALERT_WINDOW_MINUTES, MIN_BUY_SIZE_USDC, MIN_CONCURRENT_WALLETS,
-    MONITORING_CYCLE_DELAY, MAX_PRICE_THRESHOLD
+    MONITORING_CYCLE_DELAY, MAX_PRICE_THRESHOLD, MARKET_DETAILS_CACHE_TTL
 )
 from .sourcing import fetch_top_traders
+from backend.services.http_sessions import build_sessions
 
 # Configure logging
 logger = logging.getLogger("wallets_bot")
 
+# Built once instead of a ClientTimeout per request
+WALLET_ACTIVITY_TIMEOUT = aiohttp.ClientTimeout(total=15)
+MARKET_DETAILS_TIMEOUT = aiohttp.ClientTimeout(total=30)
+
+
+def wallet_fingerprint(wallet):
+    """64-bit hash of a wallet address; XOR of these identifies a wallet set regardless of order"""
+    return int.from_bytes(hashlib.blake2b(wallet.encode(), digest_size=8).digest(), 'little')
+
+
 class WalletsBot:
     def __init__(self, signal_store, ws_manager):
         self.signal_store = signal_store
@@ -25,12 +38,20 @@ class WalletsBot:
         self.wallet_checkpoints = {}
         self.trader_info = {}
         self.sessions = []
-        self.sent_alerts = {}  # Track sent alerts to prevent duplicates: (market_id, outcomeIndex, category) -> set(wallets)
+        self._n_sessions = 0
+        self._session_counter = itertools.count()
+        self.sent_alerts = {}  # Track sent alerts to prevent duplicates: (market_id, outcomeIndex, category) -> wallet set fingerprint
+        self.wallet_fp = {}  # wallet -> wallet_fingerprint(wallet), filled after traders are loaded
+        self.dirty_markets = set()  # markets whose wallet set changed since the last check_for_alerts
+        self.expiry_heap = []  # (trade timestamp, market_id, wallet), oldest first
+        self.alert_keys_by_market = {}  # market_id -> sent_alerts keys, for O(1) cleanup
+        self.market_details_cache = {}  # slug -> (fetched_at, details)
         
     def get_random_session(self):
-        if not self.sessions:
+        """Round-robin over the proxy sessions (spreads load more evenly than random picks)"""
+        if not self._n_sessions:
             return None
-        return random.choice(self.sessions)
+        return self.sessions[next(self._session_counter) % self._n_sessions]
 
     def get_random_headers(self):
         return {
@@ -58,10 +79,10 @@ class WalletsBot:
             start_time = time.time()
             try:
                 # Proxy is already bound to the session
-                async with session.get(MONITORING_URL, params=params, headers=headers, timeout=15, ssl=False) as response:
+                async with session.get(MONITORING_URL, params=params, headers=headers, timeout=WALLET_ACTIVITY_TIMEOUT, ssl=False) as response:
                     elapsed = time.time() - start_time
                     if response.status == 200:
-                        data = await response.json()
+                        data = await response.json(loads=orjson.loads)
                         # logger.debug(f"Wallet {wallet}: fetch successful in {elapsed:.3f}s")
                         return data
                     else:
@@ -134,37 +155,53 @@ class WalletsBot:
                     "eventSlug": activity.get("eventSlug", "")
                 }
                 self.active_markets[market_id][wallet] = trade_data
+                self.dirty_markets.add(market_id)
+                heapq.heappush(self.expiry_heap, (ts_seconds, market_id, wallet))
         
         # Update checkpoint
         self.wallet_checkpoints[wallet] = new_checkpoint
 
     def cleanup_active_markets(self):
-        """Removes entries older than ALERT_WINDOW_MINUTES."""
-        current_time = time.time()
-        cutoff_time = current_time - (ALERT_WINDOW_MINUTES * 60)
-
-        markets_to_remove = []
-
-        for market_id, wallets in self.active_markets.items():
-            # Remove old wallets
-            wallets_to_remove = [w for w, data in wallets.items() if data["timestamp"] < cutoff_time]
-            for w in wallets_to_remove:
-                del wallets[w]
-
+        """Removes entries older than ALERT_WINDOW_MINUTES.
+
+        Pops expired trades off expiry_heap instead of sweeping every market; heap entries
+        for trades that were since overwritten by a newer one are skipped.
+        """
+        cutoff_time = time.time() - (ALERT_WINDOW_MINUTES * 60)
+        heap = self.expiry_heap
+        touched = set()
+
+        while heap and heap[0][0] < cutoff_time:
+            _, market_id, wallet = heapq.heappop(heap)
+            wallets = self.active_markets.get(market_id)
             if not wallets:
-                markets_to_remove.append(market_id)
+                continue
+            data = wallets.get(wallet)
+            if data is None or data["timestamp"] >= cutoff_time:
+                continue
+            del wallets[wallet]
+            touched.add(market_id)
+
+        for m in touched:
+            if self.active_markets[m]:
+                # Smaller wallet set may still qualify with a different group
+                self.dirty_markets.add(m)
+                continue
 
-        for m in markets_to_remove:
             del self.active_markets[m]
-            
-            # Also cleanup sent_alerts for this market
-            # We need to find keys that start with this market_id
-            keys_to_remove = [k for k in self.sent_alerts.keys() if k[0] == m]
-            for k in keys_to_remove:
-                del self.sent_alerts[k]
+            self.dirty_markets.discard(m)
+
+            # Also cleanup sent_alerts and cached details for this market
+            for k in self.alert_keys_by_market.pop(m, ()):
+                self.sent_alerts.pop(k, None)
+            self.market_details_cache.pop(m, None)
 
     async def fetch_market_details(self, slug):
-        """Fetches market details from Gamma API."""
+        """Fetches market details from Gamma API, cached for MARKET_DETAILS_CACHE_TTL."""
+        cached = self.market_details_cache.get(slug)
+        if cached and time.time() - cached[0] < MARKET_DETAILS_CACHE_TTL:
+            return cached[1]
+
         url = f"https://gamma-api.polymarket.com/markets/slug/{slug}"
         max_retries = 3
         for attempt in range(max_retries):
@@ -174,17 +211,23 @@ class WalletsBot:
             headers = self.get_random_headers()
             
             try:
-                async with session.get(url, headers=headers, timeout=30, ssl=False) as response:
+                async with session.get(url, headers=headers, timeout=MARKET_DETAILS_TIMEOUT, ssl=False) as response:
                     if response.status == 200:
-                        return await response.json()
+                        details = await response.json(loads=orjson.loads)
+                        self.market_details_cache[slug] = (time.time(), details)
+                        return details
             except Exception:
                 pass
         return None
 
     async def check_for_alerts(self):
-        """Checks active markets for alert conditions."""
-        for market_id, wallets in self.active_markets.items():
-            if len(wallets) < MIN_CONCURRENT_WALLETS:
+        """Checks markets with new activity for alert conditions."""
+        # Pass 1: collect groups that would alert (no I/O)
+        candidates = []
+        dirty, self.dirty_markets = self.dirty_markets, set()
+        for market_id in dirty:
+            wallets = self.active_markets.get(market_id)
+            if not wallets or len(wallets) < MIN_CONCURRENT_WALLETS:
                 continue
 
             # Group by (outcomeIndex, category)
@@ -200,119 +243,126 @@ class WalletsBot:
 
             # Check for groups with >= MIN_CONCURRENT_WALLETS
             for (oi, category), group in outcome_category_groups.items():
-                if len(group) >= MIN_CONCURRENT_WALLETS:
-                    # Deduplication check
-                    current_wallets_set = set(w for w, _ in group)
-                    alert_key = (market_id, oi, category)
-                    
-                    if alert_key in self.sent_alerts:
-                        previous_wallets_set = self.sent_alerts[alert_key]
-                        # If the set of wallets is exactly the same, skip alert
-                        if current_wallets_set == previous_wallets_set:
-                            continue
-
-                    # Get common outcome text
-                    outcome_text = group[0][1]["outcome"]
-                    outcome_idx = int(group[0][1]["outcomeIndex"])
-                    total_usd = sum(trade["usdcSize"] for _, trade in group)
-
-                    # Fetch market details for price and asset_id
-                    market_details = await self.fetch_market_details(market_id)
-                    current_price = 0.0
-                    asset_id = None
-
-                    if market_details:
+                if len(group) < MIN_CONCURRENT_WALLETS:
+                    continue
+
+                # Deduplication check: XOR of wallet fingerprints == same wallet set
+                current_fp = 0
+                for w, _ in group:
+                    fp = self.wallet_fp.get(w)
+                    if fp is None:
+                        fp = self.wallet_fp[w] = wallet_fingerprint(w)
+                    current_fp ^= fp
+                alert_key = (market_id, oi, category)
+
+                # If the set of wallets is exactly the same, skip alert
+                if self.sent_alerts.get(alert_key) == current_fp:
+                    continue
+
+                candidates.append((market_id, category, group, alert_key, current_fp))
+
+        if not candidates:
+            return
+
+        # Pass 2: fetch market details for price and asset_id concurrently, once per market
+        market_ids = list(dict.fromkeys(c[0] for c in candidates))
+        results = await asyncio.gather(*(self.fetch_market_details(m) for m in market_ids), return_exceptions=True)
+        details_by_market = {m: (None if isinstance(r, BaseException) else r) for m, r in zip(market_ids, results)}
+
+        for market_id, category, group, alert_key, current_fp in candidates:
+            # Get common outcome text
+            outcome_text = group[0][1]["outcome"]
+            outcome_idx = int(group[0][1]["outcomeIndex"])
+            total_usd = sum(trade["usdcSize"] for _, trade in group)
+
+            market_details = details_by_market[market_id]
+            current_price = 0.0
+            asset_id = None
+
+            if market_details:
+                try:
+                    # 1. Parse Prices
+                    outcome_prices_raw = market_details.get("outcomePrices", "[]")
+                    prices = []
+                    if isinstance(outcome_prices_raw, list):
+                        prices = outcome_prices_raw
+                    elif isinstance(outcome_prices_raw, str):
                         try:
-                            # 1. Parse Prices
-                            outcome_prices_raw = market_details.get("outcomePrices", "[]")
+                            prices = orjson.loads(outcome_prices_raw)
+                        except orjson.JSONDecodeError:
                             prices = []
-                            if isinstance(outcome_prices_raw, list):
-                                prices = outcome_prices_raw
-                            elif isinstance(outcome_prices_raw, str):
-                                try:
-                                    prices = json.loads(outcome_prices_raw)
-                                except json.JSONDecodeError:
-                                    prices = []
-
-                            if 0 <= outcome_idx < len(prices):
-                                current_price = float(prices[outcome_idx])
-                                
-                            # 2. Parse Token IDs (Asset IDs)
-                            clob_ids_raw = market_details.get("clobTokenIds", "[]")
-                            clob_ids = []
-                            if isinstance(clob_ids_raw, list):
-                                clob_ids = clob_ids_raw
-                            elif isinstance(clob_ids_raw, str):
-                                try:
-                                    clob_ids = json.loads(clob_ids_raw)
-                                except json.JSONDecodeError:
-                                    clob_ids = []
-                            
-                            if 0 <= outcome_idx < len(clob_ids):
-                                asset_id = str(clob_ids[outcome_idx])
-                                
-                        except Exception as e:
-                            logger.error(f"Error parsing details for {market_id}: {e}")
-                            pass
-                            
-                    # Price Filter Check
-                    if current_price > MAX_PRICE_THRESHOLD:
-                        # logger.info(f"Skipping alert for {market_id} - Price {current_price} > {MAX_PRICE_THRESHOLD}")
-                        continue
-
-                    # Update sent alerts with current set (only if we are actually going to alert)
-                    self.sent_alerts[alert_key] = current_wallets_set
-
-                    # Construct signal data
-                    wallets_list = []
-                    for w, trade in group:
-                        trader_data = self.trader_info.get(w, {}).get("data", {})
-                        wallets_list.append({
-                            "address": w,
-                            "win_rate": round(trader_data.get("win_rate", 0) * 100, 1),
-                            "buy_price": trade.get("price", 0),
-                            "size": trade.get("usdcSize", 0)
-                        })
-
-                    event_slug = group[0][1].get("eventSlug", "")
-                    
-                    signal_data = {
-                        "market_id": market_id,
-                        "question": group[0][1]['title'],
-                        "outcome": outcome_text,
-                        "price": current_price,
-                        "usdc_size": total_usd,
-                        "timestamp": time.time(),
-                        "wallets": wallets_list,
-                        "category": category,
-                        "event_slug": event_slug,
-                        "asset_id": asset_id,
-                        "type": "wallet_signal"
-                    }
-                    
-                    logger.info(f"🚨 WALLET ALERT! {category} - {outcome_text} ({len(wallets_list)} wallets)")
-                    
-                    # Save to DB
-                    if self.signal_store:
-                        self.signal_store.add_wallet_signal(signal_data)
-                        
-                    # Broadcast
-                    if self.ws_manager:
-                        # Assuming async broadcast
+
+                    if 0 <= outcome_idx < len(prices):
+                        current_price = float(prices[outcome_idx])
+
+                    # 2. Parse Token IDs (Asset IDs)
+                    clob_ids_raw = market_details.get("clobTokenIds", "[]")
+                    clob_ids = []
+                    if isinstance(clob_ids_raw, list):
+                        clob_ids = clob_ids_raw
+                    elif isinstance(clob_ids_raw, str):
                         try:
-                            await self.ws_manager.broadcast(signal_data)
-                        except Exception as e:
-                            logger.error(f"Broadcast error: {e}")
-
-                    # Clear this group from active markets to avoid repeated alerts?
-                    # Or just rely on timestamps moving out of window?
-                    # The original code didn't clear, so it might alert repeatedly?
-                    # Wait, original code printed alerts every cycle.
-                    # We might want to deduplicate alerts.
-                    # For now, let's keep it as is, but maybe add a 'last_alerted' check if needed.
-                    # But since we use 'active_markets' which is cleaned up, it will alert as long as conditions met.
-                    # To avoid spam, we should probably track alerted groups.
-                    # But let's stick to original logic for now.
+                            clob_ids = orjson.loads(clob_ids_raw)
+                        except orjson.JSONDecodeError:
+                            clob_ids = []
+
+                    if 0 <= outcome_idx < len(clob_ids):
+                        asset_id = str(clob_ids[outcome_idx])
+
+                except Exception as e:
+                    logger.error(f"Error parsing details for {market_id}: {e}")
+
+            # Price Filter Check
+            if current_price > MAX_PRICE_THRESHOLD:
+                # logger.info(f"Skipping alert for {market_id} - Price {current_price} > {MAX_PRICE_THRESHOLD}")
+                # Re-check next cycle: the price may come back under the threshold
+                self.dirty_markets.add(market_id)
+                continue
+
+            # Update sent alerts with current set (only if we are actually going to alert)
+            self.sent_alerts[alert_key] = current_fp
+            self.alert_keys_by_market.setdefault(market_id, set()).add(alert_key)
+
+            # Construct signal data
+            wallets_list = []
+            for w, trade in group:
+                trader_data = self.trader_info.get(w, {}).get("data", {})
+                wallets_list.append({
+                    "address": w,
+                    "win_rate": round(trader_data.get("win_rate", 0) * 100, 1),
+                    "buy_price": trade.get("price", 0),
+                    "size": trade.get("usdcSize", 0)
+                })
+
+            event_slug = group[0][1].get("eventSlug", "")
+
+            signal_data = {
+                "market_id": market_id,
+                "question": group[0][1]['title'],
+                "outcome": outcome_text,
+                "price": current_price,
+                "usdc_size": total_usd,
+                "timestamp": time.time(),
+                "wallets": wallets_list,
+                "category": category,
+                "event_slug": event_slug,
+                "asset_id": asset_id,
+                "type": "wallet_signal"
+            }
+
+            logger.info(f"🚨 WALLET ALERT! {category} - {outcome_text} ({len(wallets_list)} wallets)")
+
+            # Save to DB
+            if self.signal_store:
+                self.signal_store.add_wallet_signal(signal_data)
+
+            # Broadcast
+            if self.ws_manager:
+                # Assuming async broadcast
+                try:
+                    await self.ws_manager.broadcast(signal_data)
+                except Exception as e:
+                    logger.error(f"Broadcast error: {e}")
 
     async def run(self):
         """Main monitoring loop."""
@@ -332,6 +382,7 @@ class WalletsBot:
             }
 
         wallets = list(self.trader_info.keys())
+        self.wallet_fp = {w: wallet_fingerprint(w) for w in wallets}
         logger.info(f"[+] Monitoring {len(wallets)} wallets across categories.")
 
         # Initialize checkpoints
@@ -341,31 +392,8 @@ class WalletsBot:
                 self.wallet_checkpoints[w] = start_checkpoint
 
         # Initialize session pool
-        self.sessions = []
-        
-        # Ensure we have enough user agents
-        agents_to_use = []
-        while len(agents_to_use) < len(PROXIES):
-            agents_to_use.extend(USER_AGENTS)
-        agents_to_use = agents_to_use[:len(PROXIES)]
-
-        for proxy_url, ua in zip(PROXIES, agents_to_use):
-            connector = None
-            if proxy_url:
-                if proxy_url.startswith('socks'):
-                    connector = ProxyConnector.from_url(proxy_url, limit=10, ssl=False, rdns=False)
-                elif proxy_url.startswith('http'):
-                    connector = ProxyConnector.from_url(proxy_url, limit=10, ssl=False, rdns=False)
-                else:
-                    connector = aiohttp.TCPConnector(limit=10, ssl=False)
-            else:
-                connector = aiohttp.TCPConnector(limit=10, ssl=False)
-
-            session = aiohttp.ClientSession(connector=connector)
-            self.sessions.append(session)
-            
-        if not self.sessions:
-             self.sessions.append(aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)))
+        self.sessions = build_sessions(PROXIES, USER_AGENTS)
+        self._n_sessions = len(self.sessions)
 
         try:
             while self.running:
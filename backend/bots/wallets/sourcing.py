@@ -1,10 +1,10 @@
-import aiohttp
 import asyncio
 import random
 import time
 import logging
-from aiohttp_socks import ProxyConnector
+import orjson
 from .config import SOURCING_URL, SOURCING_CATEGORIES, WALLETS_PER_CATEGORY, SOURCING_CRITERIA_BASE, USER_AGENTS, PROXIES
+from backend.services.http_sessions import build_sessions
 
 logger = logging.getLogger("wallets_bot")
 
@@ -58,7 +58,7 @@ async def fetch_traders_by_category(session, category):
             ) as response:
 
                 if response.status == 200:
-                    data = await response.json()
+                    data = await response.json(loads=orjson.loads)
                     # Handle response format: list or dict with 'data' key
                     if isinstance(data, dict) and "data" in data:
                         data = data["data"]
@@ -101,31 +101,7 @@ async def fetch_top_traders():
     all_traders = []
     
     # Create a local session pool for sourcing
-    sessions = []
-    
-    # Ensure we have enough user agents
-    agents_to_use = []
-    while len(agents_to_use) < len(PROXIES):
-        agents_to_use.extend(USER_AGENTS)
-    agents_to_use = agents_to_use[:len(PROXIES)]
-
-    for proxy_url, ua in zip(PROXIES, agents_to_use):
-        connector = None
-        if proxy_url:
-            if proxy_url.startswith('socks'):
-                connector = ProxyConnector.from_url(proxy_url, limit=10, ssl=False, rdns=False)
-            elif proxy_url.startswith('http'):
-                connector = ProxyConnector.from_url(proxy_url, limit=10, ssl=False, rdns=False)
-            else:
-                connector = aiohttp.TCPConnector(limit=10, ssl=False)
-        else:
-            connector = aiohttp.TCPConnector(limit=10, ssl=False)
-
-        session = aiohttp.ClientSession(connector=connector)
-        sessions.append(session)
-        
-    if not sessions:
-         sessions.append(aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)))
+    sessions = build_sessions(PROXIES, USER_AGENTS)
 
     try:
         for category in SOURCING_CATEGORIES:
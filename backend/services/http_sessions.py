@@ -0,0 +1,56 @@
+import logging
+import ssl
+from typing import List, Optional, Sequence, Union
+
+import aiohttp
+from aiohttp_socks import ProxyConnector
+
+logger = logging.getLogger("http_sessions")
+
+# Connector sizing shared by all bots. limit=0 removes aiohttp's default
+# 100-connection ceiling; limit_per_host is the real cap per proxy session,
+# so bot concurrency should stay <= CONNECTOR_LIMIT_PER_HOST * len(proxies).
+CONNECTOR_LIMIT = 0
+CONNECTOR_LIMIT_PER_HOST = 64
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 75
+
+
+def _build_connector(proxy_url: Optional[str], ssl_context: Union[ssl.SSLContext, bool]) -> aiohttp.TCPConnector:
+    connector_kwargs = dict(
+        limit=CONNECTOR_LIMIT,
+        limit_per_host=CONNECTOR_LIMIT_PER_HOST,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True,
+        ssl=ssl_context,
+    )
+    if proxy_url and proxy_url.startswith(('socks', 'http')):
+        return ProxyConnector.from_url(proxy_url, rdns=False, **connector_kwargs)
+    # No proxy, or an unformatted entry ProxyConnector can't parse
+    return aiohttp.TCPConnector(**connector_kwargs)
+
+
+def build_sessions(
+    proxies: Sequence[Optional[str]],
+    user_agents: Sequence[str] = (),
+    timeout: Optional[aiohttp.ClientTimeout] = None,
+    ssl_context: Union[ssl.SSLContext, bool] = False,
+) -> List[aiohttp.ClientSession]:
+    """Creates one keep-alive ClientSession per proxy (None = direct connection).
+
+    User agents are assigned round-robin as default session headers.
+    ssl_context=False keeps certificate verification off (legacy default);
+    pass a shared SSLContext to verify and reuse it across connections.
+    Always returns at least one session; the caller is responsible for closing them.
+    """
+    sessions = []
+    for i, proxy_url in enumerate(proxies or (None,)):
+        headers = {'User-Agent': user_agents[i % len(user_agents)]} if user_agents else None
+        session_kwargs = {'connector': _build_connector(proxy_url, ssl_context), 'headers': headers}
+        if timeout is not None:
+            session_kwargs['timeout'] = timeout
+        sessions.append(aiohttp.ClientSession(**session_kwargs))
+
+    logger.debug(f"Created {len(sessions)} HTTP sessions")
+    return sessions
@@ -125,6 +125,28 @@ class SignalStore:
             CREATE INDEX IF NOT EXISTS idx_portfolio_value_lookup
             ON portfolio_value_snapshots (proxy_wallet, timestamp)
         ''')
+
+        # Fetcher wallet stats cache (traded count, volume, age) to skip repeat API calls across runs
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS wallet_stats (
+                address TEXT PRIMARY KEY,
+                traded INTEGER,
+                volume REAL,
+                age_days INTEGER,
+                updated_at REAL NOT NULL
+            )
+        ''')
+
+        # Fetcher median/open-positions cache, valid while the wallet's trade count (fingerprint) is unchanged
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS wallet_medians (
+                address TEXT PRIMARY KEY,
+                fingerprint INTEGER,
+                median REAL,
+                open_positions TEXT, -- JSON dict asset_id -> initialValue
+                updated_at REAL NOT NULL
+            )
+        ''')
         
         self.conn.commit()
         logger.info("SignalStore initialized with SQLite")
@@ -312,6 +334,42 @@ class SignalStore:
             return (row['sus_count'], row['sus_count_yes'] or 0, row['sus_count_no'] or 0)
         return (0, 0, 0)
 
+    def record_holder_counts_batch(self, snapshots: List[tuple]):
+        """Record many (condition_id, sus_count, timestamp, sus_count_yes, sus_count_no) snapshots in one transaction."""
+        try:
+            self.cursor.executemany(
+                'INSERT INTO holder_history (condition_id, sus_count, sus_count_yes, sus_count_no, timestamp) VALUES (?, ?, ?, ?, ?)',
+                [(cid, sus, yes, no, ts) for cid, sus, ts, yes, no in snapshots]
+            )
+            self.conn.commit()
+        except Exception as e:
+            logger.error(f"Error recording holder counts: {e}")
+
+    def get_baseline_counts_batch(self, condition_ids, current_timestamp: float) -> Dict[str, tuple]:
+        """Batch get_baseline_count: {condition_id: (sus_count, sus_count_yes, sus_count_no)}.
+        Markets without any history are absent from the result.
+        """
+        target_time = current_timestamp - (24 * 60 * 60)  # 24 hours ago
+        condition_ids = list(condition_ids)
+        result = {}
+        for i in range(0, len(condition_ids), 500):
+            chunk = condition_ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            # Closest to 24h ago (but not newer); otherwise the oldest available record
+            self.cursor.execute(f'''
+                SELECT condition_id, sus_count, sus_count_yes, sus_count_no FROM (
+                    SELECT *, ROW_NUMBER() OVER (
+                        PARTITION BY condition_id
+                        ORDER BY timestamp <= ? DESC,
+                                 CASE WHEN timestamp <= ? THEN -timestamp ELSE timestamp END
+                    ) AS rn
+                    FROM holder_history WHERE condition_id IN ({placeholders})
+                ) WHERE rn = 1
+            ''', (target_time, target_time, *chunk))
+            for row in self.cursor.fetchall():
+                result[row['condition_id']] = (row['sus_count'], row['sus_count_yes'] or 0, row['sus_count_no'] or 0)
+        return result
+
     def cleanup_old_history(self):
         """Remove holder history older than 25 hours."""
         import time
@@ -341,3 +399,72 @@ class SignalStore:
         ''', (proxy_wallet, target_timestamp))
         row = self.cursor.fetchone()
         return dict(row) if row else None
+
+    def get_wallet_stats_batch(self, addresses, max_age_s: float = 3600) -> Dict[str, tuple]:
+        """Cached (traded, volume, age_days) for addresses updated within max_age_s.
+        age_days is advanced by the whole days elapsed since it was stored.
+        """
+        import time
+        now = time.time()
+        addresses = list(addresses)
+        result = {}
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(addresses), 500):
+            chunk = addresses[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            self.cursor.execute(
+                f'SELECT address, traded, volume, age_days, updated_at FROM wallet_stats '
+                f'WHERE updated_at >= ? AND address IN ({placeholders})',
+                (now - max_age_s, *chunk)
+            )
+            for row in self.cursor.fetchall():
+                age = row['age_days']
+                if age is not None:
+                    age += int(now - row['updated_at']) // 86400
+                result[row['address']] = (row['traded'], row['volume'], age)
+        return result
+
+    def put_wallet_stats_batch(self, stats: Dict[str, tuple]):
+        """Upsert (traded, volume, age_days) per address in one transaction."""
+        import time
+        now = time.time()
+        try:
+            self.cursor.executemany(
+                'INSERT OR REPLACE INTO wallet_stats (address, traded, volume, age_days, updated_at) VALUES (?, ?, ?, ?, ?)',
+                [(address, traded, volume, age, now) for address, (traded, volume, age) in stats.items()]
+            )
+            self.conn.commit()
+        except Exception as e:
+            logger.error(f"Error saving wallet stats: {e}")
+
+    def get_wallet_medians_batch(self, addresses, max_age_s: float = 600) -> Dict[str, tuple]:
+        """Cached (fingerprint, median, open_positions) for addresses updated within max_age_s."""
+        import time
+        now = time.time()
+        addresses = list(addresses)
+        result = {}
+        for i in range(0, len(addresses), 500):
+            chunk = addresses[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            self.cursor.execute(
+                f'SELECT address, fingerprint, median, open_positions FROM wallet_medians '
+                f'WHERE updated_at >= ? AND address IN ({placeholders})',
+                (now - max_age_s, *chunk)
+            )
+            for row in self.cursor.fetchall():
+                result[row['address']] = (row['fingerprint'], row['median'], json.loads(row['open_positions'] or '{}'))
+        return result
+
+    def put_wallet_medians_batch(self, medians: Dict[str, tuple]):
+        """Upsert (fingerprint, median, open_positions) per address in one transaction."""
+        import time
+        now = time.time()
+        try:
+            self.cursor.executemany(
+                'INSERT OR REPLACE INTO wallet_medians (address, fingerprint, median, open_positions, updated_at) VALUES (?, ?, ?, ?, ?)',
+                [(address, fingerprint, median, json.dumps(open_positions), now)
+                 for address, (fingerprint, median, open_positions) in medians.items()]
+            )
+            self.conn.commit()
+        except Exception as e:
+            logger.error(f"Error saving wallet medians: {e}")